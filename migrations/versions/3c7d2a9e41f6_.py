@@ -0,0 +1,26 @@
+"""Keyset pagination indexes for the admin tables
+
+Revision ID: 3c7d2a9e41f6
+Revises: 2176ea8461d8
+Create Date: 2026-10-18 12:40:12.118204
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '3c7d2a9e41f6'
+down_revision = '2176ea8461d8'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_index('ix_jobs_created_id', 'jobs', ['created', 'id'])
+    op.create_index('ix_jobs_title_id', 'jobs', ['title', 'id'])
+    op.create_index('ix_user_created_id', 'user', ['created', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_user_created_id', 'user')
+    op.drop_index('ix_jobs_title_id', 'jobs')
+    op.drop_index('ix_jobs_created_id', 'jobs')
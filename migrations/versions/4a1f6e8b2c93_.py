@@ -0,0 +1,34 @@
+"""Indexes on foreign keys and columns used for ordering
+
+Revision ID: 4a1f6e8b2c93
+Revises: 3c7d2a9e41f6
+Create Date: 2026-10-18 13:05:47.502311
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '4a1f6e8b2c93'
+down_revision = '3c7d2a9e41f6'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_index('ix_jobs_updated', 'jobs', ['updated'])
+    op.create_index('ix_jobs_user_id', 'jobs', ['user_id'])
+    op.create_index(
+        'ix_jobs_spec',
+        'jobs',
+        ['spec'],
+        postgresql_ops={'spec': 'varchar_pattern_ops'})
+    op.create_index('ix_user_last_login_at', 'user', ['last_login_at'])
+    op.create_index('ix_users_roles_role_id', 'users_roles', ['role_id'])
+
+
+def downgrade():
+    op.drop_index('ix_users_roles_role_id', 'users_roles')
+    op.drop_index('ix_user_last_login_at', 'user')
+    op.drop_index('ix_jobs_spec', 'jobs')
+    op.drop_index('ix_jobs_user_id', 'jobs')
+    op.drop_index('ix_jobs_updated', 'jobs')
@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+
+# Imported first so start up profiling covers every other module
+from soon.startup import startup  # noqa
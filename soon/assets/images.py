@@ -0,0 +1,470 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: soon.assets.images
+   :synopsis: Image recompression, responsive width variants and the
+              ``responsive_image`` template helper
+"""
+
+import json
+import os
+
+from flask import current_app, url_for
+from jinja2 import Markup, escape
+
+
+# Formats variants are generated in, in order of preference
+VARIANT_FORMATS = [
+    ('webp', 'image/webp'),
+    ('png', None),
+]
+
+# A transparent 1x1 GIF, the source of images hidden at a breakpoint so
+# nothing is downloaded there
+BLANK_IMAGE = 'data:image/gif;base64,' \
+    'R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7'
+
+
+def variant_name(name, width, fmt):
+    """
+    Relative name of a width variant, e.g ``img/folio/ra1.png`` at 480
+    pixels wide in WebP is ``img/responsive/folio/ra1-480w.webp``
+
+    :param name: Relative name of the source image within the static folder
+    :type name: str
+
+    :param width: Variant width in pixels
+    :type width: int
+
+    :param fmt: Variant file format (extension)
+    :type fmt: str
+
+    :returns: str -- Relative variant name
+    """
+
+    root = os.path.splitext(os.path.relpath(name, 'img'))[0]
+
+    return 'img/responsive/{0}-{1}w.{2}'.format(root, width, fmt)
+
+
+def static_url(filename):
+    """
+    Url of a static file, memoized by :py:class:`soon.assets.manifest.Assets`
+    when it is registered
+
+    :param filename: Name of the file relative to the static folder
+    :type filename: str
+
+    :returns: str -- Url
+    """
+
+    assets = current_app.extensions.get('assets')
+    if assets is None:
+        return url_for('static', filename=filename)
+
+    return assets.static_url(filename)
+
+
+def optimise(path, image):
+    """
+    Recompress an image in place, keeping the original when it is already
+    smaller.
+
+    :param path: Absolute path of the image
+    :type path: str
+
+    :param image: The opened image
+    :type image: PIL.Image.Image
+
+    :returns: int -- Bytes saved
+    """
+
+    original = os.path.getsize(path)
+    tmp = path + '.tmp'
+
+    if image.format == 'JPEG':
+        image.save(tmp, 'JPEG', quality=85, optimize=True, progressive=True)
+    else:
+        image.save(tmp, 'PNG', optimize=True)
+
+    saved = original - os.path.getsize(tmp)
+    if saved > 0:
+        os.rename(tmp, path)
+    else:
+        os.remove(tmp)
+
+    return max(saved, 0)
+
+
+def build_variants(app, verbose=False):
+    """
+    Recompress images under the ``IMAGE_VARIANT_DIRS`` and write resized
+    WebP and PNG copies for every ``IMAGE_WIDTHS`` bucket narrower than the
+    original, plus a full width WebP copy. The available widths are recorded
+    in ``IMAGE_VARIANTS_MANIFEST`` which the ``responsive_image`` helper
+    reads. Run before ``manage.py collect`` so variants are fingerprinted.
+
+    Requires ``Pillow`` built with WebP support.
+
+    :param app: Flask application instance
+    :type app: flask.app.Flask
+
+    :param verbose: Print progress
+    :type verbose: bool
+
+    :returns: dict -- Image name to available widths
+    """
+
+    from PIL import Image
+
+    # Always the source static folder, not the collected static root
+    static = os.path.join(app.root_path, 'static')
+    variants = {}
+
+    for directory in app.config['IMAGE_VARIANT_DIRS']:
+        for root, _, files in os.walk(os.path.join(static, directory)):
+            for filename in sorted(files):
+                if not filename.lower().endswith(('.png', '.jpg', '.jpeg')):
+                    continue
+
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, static)
+                image = Image.open(path)
+                saved = optimise(path, image)
+
+                width, height = image.size
+                widths = [w for w in app.config['IMAGE_WIDTHS'] if w < width]
+                widths.append(width)
+
+                # Palette images are resized in full colour then quantized
+                # back so PNG variants stay small
+                palette = image.mode == 'P'
+                if image.mode not in ('RGB', 'RGBA'):
+                    image = image.convert('RGBA')
+
+                for w in widths:
+                    resized = image
+                    if w != width:
+                        resized = image.resize(
+                            (w, int(round(height * w / float(width)))),
+                            Image.ANTIALIAS)
+
+                    for fmt, _ in VARIANT_FORMATS:
+                        if w == width and fmt != 'webp':
+                            # The source image is the full width fallback
+                            continue
+                        out = os.path.join(static, variant_name(name, w, fmt))
+                        if not os.path.isdir(os.path.dirname(out)):
+                            os.makedirs(os.path.dirname(out))
+                        if fmt == 'webp':
+                            resized.save(out, 'WEBP', quality=80, method=6)
+                        elif palette:
+                            resized.quantize(256, method=2).save(
+                                out, 'PNG', optimize=True)
+                        else:
+                            resized.save(out, 'PNG', optimize=True)
+
+                variants[name] = widths
+
+                if verbose:
+                    print('{0}: saved {1} bytes, widths {2}'.format(
+                        name, saved, widths))
+
+    with open(os.path.join(
+            static,
+            app.config['IMAGE_VARIANTS_MANIFEST']), 'w') as f:
+        json.dump(variants, f, indent=2, sort_keys=True)
+
+    return variants
+
+
+class ResponsiveImages(object):
+    """
+    Provides the ``responsive_image`` template global which renders a
+    ``<picture>`` element so each client downloads a single image of the
+    right size, in WebP where supported:
+
+        {{ responsive_image('img/folio/ra1.png',
+                            mobile='img/folio/ra1-m.png',
+                            alt='Resident Advisor') }}
+
+    The ``mobile`` image replaces the hand made ``hidden-xs`` /
+    ``hidden-sm`` pairs, it is picked below the ``IMAGE_MOBILE_MEDIA``
+    breakpoint. Without a variants manifest the original images are used.
+
+    Sections with a background image on larger screens and a mobile image
+    in its place use ``responsive_background`` and ``mobile_image``, so
+    phones download only the mobile image:
+
+        {{ responsive_background('#ra6-background', 'img/folio/ra6.png',
+                                 cover=True) }}
+        <div id="ra6-background">
+            {{ mobile_image('img/folio/ra6-m.png', class_='visible-xs') }}
+        </div>
+    """
+
+    def __init__(self, app=None):
+        self.variants = {}
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Register the helper with the application
+
+        :param app: Flask application instance
+        :type app: flask.app.Flask
+        """
+
+        try:
+            with open(os.path.join(
+                    app.static_folder,
+                    app.config['IMAGE_VARIANTS_MANIFEST'])) as f:
+                self.variants = json.load(f)
+        except IOError:
+            self.variants = {}
+
+        app.extensions['responsive_images'] = self
+        app.jinja_env.globals.update(
+            responsive_image=self.render,
+            responsive_background=self.background,
+            mobile_image=self.mobile_image)
+
+    def srcset(self, name, fmt):
+        """
+        Build a ``srcset`` attribute value for an image in the given format,
+        None if no variants exist for it.
+
+        :param name: Relative name of the source image
+        :type name: str
+
+        :param fmt: Variant format
+        :type fmt: str
+
+        :returns: str or None
+        """
+
+        widths = self.variants.get(name)
+        if not widths:
+            return None
+
+        candidates = []
+        for width in widths:
+            if width == widths[-1] and fmt != 'webp':
+                url = static_url(name)
+            else:
+                url = static_url(variant_name(name, width, fmt))
+            candidates.append('{0} {1}w'.format(url, width))
+
+        return ', '.join(candidates)
+
+    def sizes(self, name, sizes=None):
+        """
+        Returns the ``sizes`` attribute for an image, defaults to the image
+        filling the viewport up to its natural width, matching how a
+        ``max-width: 100%`` image is laid out.
+
+        :param name: Relative name of the source image
+        :type name: str
+
+        :param sizes: Explicit ``sizes`` value
+        :type sizes: str
+
+        :returns: str
+        """
+
+        if sizes:
+            return sizes
+
+        width = self.variants[name][-1]
+
+        return '(max-width: {0}px) 100vw, {0}px'.format(width)
+
+    def tag(self, name, attrs):
+        """
+        Render an HTML tag with escaped attributes
+
+        :param name: Tag name
+        :type name: str
+
+        :param attrs: List of (attribute, value) tuples
+        :type attrs: list
+
+        :returns: unicode
+        """
+
+        return u'<{0} {1}>'.format(name, u' '.join(
+            u'{0}="{1}"'.format(k, escape(v)) for k, v in attrs))
+
+    def sources(self, name, sizes, media=None, formats=VARIANT_FORMATS):
+        """
+        Returns ``<source>`` tags for each variant format of an image. When
+        a ``media`` query is given and no variants exist the image itself is
+        used so art direction works without a variants manifest.
+
+        :returns: list -- Rendered tags
+        """
+
+        tags = []
+
+        for fmt, mimetype in formats:
+            srcset = self.srcset(name, fmt)
+            if srcset is None:
+                continue
+            attrs = [('srcset', srcset), ('sizes', self.sizes(name, sizes))]
+            if mimetype:
+                attrs.append(('type', mimetype))
+            if media:
+                attrs.append(('media', media))
+            tags.append(self.tag('source', attrs))
+
+        if media and not tags:
+            tags.append(self.tag('source', [
+                ('srcset', static_url(name)),
+                ('media', media)]))
+
+        return tags
+
+    def render(self, src, mobile=None, sizes=None, mobile_sizes=None,
+               alt='', class_=None, **attrs):
+        """
+        Render a responsive ``<picture>`` element
+
+        :param src: Relative name of the full size image
+        :type src: str
+
+        :param mobile: Optional relative name of the mobile image
+        :type mobile: str
+
+        :param sizes: Optional ``sizes`` attribute for the full size image
+        :type sizes: str
+
+        :param mobile_sizes: Optional ``sizes`` attribute for the mobile image
+        :type mobile_sizes: str
+
+        :param alt: Image alternate text
+        :type alt: str
+
+        :param class_: CSS class of the ``<picture>`` element
+        :type class_: str
+
+        :returns: jinja2.Markup
+        """
+
+        tags = []
+
+        if mobile:
+            tags.extend(self.sources(
+                mobile,
+                mobile_sizes,
+                media=current_app.config['IMAGE_MOBILE_MEDIA']))
+
+        return self.picture(tags, src, sizes, alt, class_, attrs)
+
+    def mobile_image(self, src, sizes=None, alt='', class_=None, **attrs):
+        """
+        Render a ``<picture>`` element for an image shown only below
+        ``IMAGE_BACKGROUND_MIN_WIDTH``, in place of a background. Wider
+        screens are given a blank image, an image hidden by CSS alone is
+        still downloaded.
+
+        :param src: Relative name of the mobile image
+        :type src: str
+
+        :param sizes: Optional ``sizes`` attribute
+        :type sizes: str
+
+        :param alt: Image alternate text
+        :type alt: str
+
+        :param class_: CSS class of the ``<picture>`` element
+        :type class_: str
+
+        :returns: jinja2.Markup
+        """
+
+        tags = [self.tag('source', [
+            ('srcset', BLANK_IMAGE),
+            ('media', '(min-width: {0}px)'.format(
+                current_app.config['IMAGE_BACKGROUND_MIN_WIDTH']))])]
+
+        return self.picture(tags, src, sizes, alt, class_, attrs)
+
+    def picture(self, tags, src, sizes, alt, class_, attrs):
+        """
+        Render a ``<picture>`` element of the given ``<source>`` tags
+        followed by those of an image and its ``<img>`` tag, PNG variants go
+        on the ``<img>`` itself.
+
+        :returns: jinja2.Markup
+        """
+
+        tags = tags + self.sources(
+            src,
+            sizes,
+            formats=[f for f in VARIANT_FORMATS if f[1]])
+
+        img = [('src', static_url(src)), ('alt', alt)]
+        srcset = self.srcset(src, 'png')
+        if srcset:
+            img.extend([('srcset', srcset), ('sizes', self.sizes(src, sizes))])
+        img.extend(sorted(attrs.items()))
+        tags.append(self.tag('img', img))
+
+        picture = u'<picture class="{0}">'.format(escape(class_)) \
+            if class_ else u'<picture>'
+
+        return Markup(u'{0}{1}</picture>'.format(picture, u''.join(tags)))
+
+    def background(self, selector, src, cover=False):
+        """
+        Render a ``<style>`` element giving the elements matching
+        ``selector`` a background image from ``IMAGE_BACKGROUND_MIN_WIDTH``
+        up, phones download none. A ``cover`` background scales with the
+        viewport, each range of widths gets the narrowest PNG variant at
+        least as wide. Other backgrounds are shown at their natural size so
+        always use the full image. Variants are PNG only, CSS has no
+        fallback for browsers without WebP.
+
+        The element's own ``style`` must not use the ``background``
+        shorthand, it would override the image.
+
+        :param selector: CSS selector of the elements
+        :type selector: str
+
+        :param src: Relative name of the image
+        :type src: str
+
+        :param cover: The background is sized to cover the viewport
+        :type cover: bool
+
+        :returns: jinja2.Markup
+        """
+
+        min_width = current_app.config['IMAGE_BACKGROUND_MIN_WIDTH']
+        widths = self.variants.get(src, []) if cover else []
+
+        rules = []
+        lower = min_width
+        for width in widths:
+            if width < min_width:
+                continue
+            if width == widths[-1]:
+                url = static_url(src)
+            else:
+                url = static_url(variant_name(src, width, 'png'))
+            rules.append((lower, url))
+            lower = width + 1
+
+        if not rules:
+            rules = [(min_width, static_url(src))]
+
+        # Style element contents are not unescaped, urls are quoted instead
+        css = u''.join(
+            u'@media (min-width: {0}px) {{ {1} {{ '
+            u'background-image: url("{2}"); }} }}'.format(
+                lower, selector, url.replace('"', '%22'))
+            for lower, url in rules)
+
+        return Markup(u'<style>{0}</style>'.format(css))
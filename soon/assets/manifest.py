@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: soon.assets.manifest
+   :synopsis: Serve fingerprinted static assets from the manifest written by
+              :py:class:`soon.assets.storage.Storage`
+"""
+
+import hashlib
+import json
+import os
+
+from flask import (
+    current_app,
+    has_request_context,
+    request,
+    send_from_directory,
+    url_for)
+
+
+class Assets(object):
+    """
+    Loads the asset manifest, if one has been collected, and rewrites
+    ``url_for('static', filename=...)`` to the content hashed file name.
+    Hashed files never change so are served with far future, immutable
+    Cache-Control headers, from the collected static root rather than the
+    static folder, which Flask-Collect keeps collecting from. Without a
+    manifest (development) static urls are left untouched and bundles expand
+    to their individual source files.
+
+    Static urls built through :py:meth:`static_url` are memoized per file
+    name and manifest version.
+    """
+
+    def __init__(self, app=None):
+        self.manifest = {}
+        self.hashed = frozenset()
+        self.static_root = None
+        self.version = None
+        self._urls = {}
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Register the asset manifest with the application
+
+        :param app: Flask application instance
+        :type app: flask.app.Flask
+        """
+
+        static_root = app.config['COLLECT_STATIC_ROOT']
+
+        self.manifest = self.load(os.path.join(
+            static_root,
+            app.config['ASSETS_MANIFEST']))
+        self.hashed = frozenset(self.manifest.values())
+        self.version = hashlib.sha1(
+            json.dumps(self.manifest, sort_keys=True)).hexdigest()
+
+        # Hashed files only exist in the collected static root, served by
+        # the static endpoint in place of the static folder
+        if self.manifest:
+            self.static_root = static_root
+            app.view_functions['static'] = self.send_static_file
+
+        app.extensions['assets'] = self
+        app.url_defaults(self.hash_url)
+        app.after_request(self.cache_headers)
+        app.jinja_env.globals['asset_urls'] = self.urls
+        app.jinja_env.globals['static_url'] = self.static_url
+
+    def load(self, path):
+        """
+        Read the manifest file, returns an empty dict if it does not exist
+
+        :param path: Absolute path to the manifest
+        :type path: str
+
+        :returns: dict -- Original name to hashed name mapping
+        """
+
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except IOError:
+            return {}
+
+    def send_static_file(self, filename):
+        """
+        View of the ``static`` endpoint once a manifest is collected, serves
+        files from the collected static root
+
+        :param filename: Name of the file relative to the static root
+        :type filename: str
+
+        :returns: flask.Response
+        """
+
+        return send_from_directory(
+            self.static_root,
+            filename,
+            cache_timeout=current_app.get_send_file_max_age(filename))
+
+    def hash_url(self, endpoint, values):
+        """
+        ``url_defaults`` callback replacing static file names with their
+        hashed names from the manifest.
+        """
+
+        if endpoint != 'static' or not self.manifest:
+            return
+
+        filename = values.get('filename')
+        if filename in self.manifest:
+            values['filename'] = self.manifest[filename]
+
+    def cache_headers(self, response):
+        """
+        ``after_request`` hook marking hashed static files as cacheable
+        forever.
+        """
+
+        if request.endpoint == 'static' and response.status_code == 200 and \
+                request.view_args.get('filename') in self.hashed:
+            response.headers['Cache-Control'] = \
+                'public, max-age={0}, immutable'.format(
+                    current_app.config['ASSETS_MAX_AGE'])
+
+        return response
+
+    def static_url(self, filename):
+        """
+        Template global returning the url of a static file, as
+        ``url_for('static', filename=...)`` would but built once per file
+        name, manifest version and script root:
+
+            <img src="{{ static_url('img/soon_black.png') }}">
+
+        :param filename: Name of the file relative to the static folder
+        :type filename: str
+
+        :returns: str -- Url
+        """
+
+        key = (
+            self.version,
+            request.script_root if has_request_context() else None,
+            filename)
+
+        try:
+            return self._urls[key]
+        except KeyError:
+            url = self._urls[key] = url_for('static', filename=filename)
+            return url
+
+    def urls(self, name):
+        """
+        Template global returning the urls to include for an asset bundle,
+        the single hashed bundle once collected else each source file:
+
+            {% for url in asset_urls('css/site.css') %}
+            <link href="{{ url }}" rel="stylesheet">
+            {% endfor %}
+
+        :param name: Bundle name as defined in ``ASSET_BUNDLES``
+        :type name: str
+
+        :returns: list -- Urls
+        """
+
+        if name in self.manifest:
+            return [self.static_url(name)]
+
+        return [
+            self.static_url(source)
+            for source in current_app.config['ASSET_BUNDLES'][name]]
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: soon.assets.storage
+   :synopsis: Flask-Collect storage which bundles, minifies and fingerprints
+              collected static files, writing a manifest of hashed names
+"""
+
+import hashlib
+import json
+import os
+import re
+
+from flask.ext.collect.storage.file import Storage as FileStorage
+from rcssmin import cssmin
+from rjsmin import jsmin
+from soon.compression import is_compressible, precompress
+
+
+# @import rules must come first in a stylesheet so are hoisted out of bundles
+CSS_IMPORT_RE = re.compile(r'@import\s[^;]+;')
+
+
+def hashed_name(name, data, length=12):
+    """
+    Returns the file name with a digest of its content inserted before the
+    extension, e.g ``css/soon.css`` becomes ``css/soon.1a2b3c4d5e6f.css``
+
+    :param name: Relative file name
+    :type name: str
+
+    :param data: File content
+    :type data: str
+
+    :returns: str -- Hashed file name
+    """
+
+    root, ext = os.path.splitext(name)
+    digest = hashlib.md5(data).hexdigest()[:length]
+
+    return '{0}.{1}{2}'.format(root, digest, ext)
+
+
+def bundle_css(sources):
+    """
+    Concatenate and minify stylesheets, ``@import`` rules are moved to the
+    top of the bundle.
+
+    :param sources: List of stylesheet contents
+    :type sources: list
+
+    :returns: str -- Minified bundle
+    """
+
+    imports = []
+    bodies = []
+
+    for source in sources:
+        imports.extend(CSS_IMPORT_RE.findall(source))
+        bodies.append(CSS_IMPORT_RE.sub('', source))
+
+    return cssmin('\n'.join(imports + bodies))
+
+
+def bundle_js(sources):
+    """
+    Concatenate and minify scripts, each is terminated so scripts relying
+    on automatic semicolon insertion do not run into each other.
+
+    :param sources: List of script contents
+    :type sources: list
+
+    :returns: str -- Minified bundle
+    """
+
+    return jsmin('\n;\n'.join(sources))
+
+
+BUNDLERS = {
+    '.css': bundle_css,
+    '.js': bundle_js,
+}
+
+
+class Storage(FileStorage):
+    """
+    Collects static files as the default Flask-Collect file storage, then
+    builds the ``ASSET_BUNDLES``, writes a content hashed copy of every file
+    and pre compressed siblings of compressible files. The
+    ``ASSETS_MANIFEST`` file maps original names to hashed names and is
+    loaded by :py:class:`soon.assets.manifest.Assets`.
+
+    Enable by setting ``COLLECT_STORAGE = 'soon.assets.storage'``.
+    """
+
+    def read(self, name):
+        with open(os.path.join(self.collect.static_root, name), 'rb') as f:
+            return f.read()
+
+    def write(self, name, data):
+        path = os.path.join(self.collect.static_root, name)
+        directory = os.path.dirname(path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        with open(path, 'wb') as f:
+            f.write(data)
+
+    def bundle(self, name, sources):
+        """
+        Build a bundle from collected static files
+
+        :param name: Relative name of the bundle, e.g ``css/site.css``
+        :type name: str
+
+        :param sources: Relative names of the files to bundle
+        :type sources: list
+
+        :returns: str -- Bundle content
+        """
+
+        bundler = BUNDLERS[os.path.splitext(name)[1]]
+        data = bundler([self.read(source) for source in sources])
+
+        self.write(name, data)
+        self.log("Bundled: '{0}'".format(name))
+
+        return data
+
+    def run(self):
+        # Flask-Collect storages are old style classes
+        FileStorage.run(self)
+
+        config = self.collect.app.config
+        manifest = {}
+
+        names = set(o for bp, f, o in self)
+        bundles = config.get('ASSET_BUNDLES', {})
+
+        for name in sorted(names | set(bundles)):
+            if name in bundles:
+                data = self.bundle(name, bundles[name])
+            else:
+                data = self.read(name)
+
+            hashed = hashed_name(name, data)
+            if not os.path.exists(
+                    os.path.join(self.collect.static_root, hashed)):
+                self.write(hashed, data)
+                self.log("Hashed: '{0}'".format(hashed))
+
+            manifest[name] = hashed
+
+        # gzip / brotli siblings, served by soon.compression or the proxy
+        for name in sorted(set(manifest) | set(manifest.values())):
+            if is_compressible(self.collect.app, name):
+                precompress(os.path.join(self.collect.static_root, name))
+
+        path = os.path.join(
+            self.collect.static_root,
+            config['ASSETS_MANIFEST'])
+
+        # Write then rename so running workers never read a partial manifest
+        with open(path + '.tmp', 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.rename(path + '.tmp', path)
+
+        self.log("Manifest: '{0}'".format(path))
+
+        return manifest
@@ -9,7 +9,6 @@ from flask.ext.login import current_user
 from flask.ext.admin import BaseView, expose_plugview
 from flask.ext.velox.formatters import bool_admin_formatter
 from flask.ext.velox.admin.views.sqla import forms
-from flask.ext.velox.admin.views.sqla import read
 from flask.ext.velox.admin.views.sqla.delete import (
     AdminDeleteObjectView,
     AdminMultiDeleteObjectView)
@@ -19,6 +18,7 @@ from soon.auth.forms import (
     UpdateUserAdminForm,
     UserPasswordForm)
 from soon.auth.models import User
+from soon.views.admin.tables import KeysetTableView
 
 
 class UserAdminView(BaseView):
@@ -29,10 +29,10 @@ class UserAdminView(BaseView):
         return False
 
     @expose_plugview('/')
-    class index(read.AdminModelTableView):
+    class index(KeysetTableView):
         model = User
-        paginate = True
         columns = ['email', 'active', 'super_user', 'last_login_at']
+        sortable = ['created', 'email']
         formatters = {
             'active': bool_admin_formatter,
             'super_user': bool_admin_formatter
@@ -65,3 +65,11 @@ class UserAdminView(BaseView):
     class multi_delete(AdminMultiDeleteObjectView):
         model = User
         session = db.session
+
+
+admin = [
+    UserAdminView(
+        name='Users',
+        url='users',
+        endpoint='admin.users')
+]
@@ -5,13 +5,13 @@
    :synopsis: WTForms for authentication module
 """
 
+from flask import request
 from flask.ext.login import login_user
-from flask.ext.security.utils import (
-    encrypt_password,
-    verify_and_update_password)
+from flask.ext.security.utils import encrypt_password
 from flask.ext.wtf import Form
 from soon.auth.models import User
-from soon.ext import db
+from soon.exceptions import HashPoolBusy
+from soon.ext import db, hash_pool, login_throttle
 from wtforms_alchemy import model_form_factory
 from wtforms import TextField
 from wtforms.fields import PasswordField
@@ -80,10 +80,21 @@ class AuthenticationForm(Form):
     password = PasswordField()
 
     def validate_password(form, field):
+        # Refused before touching the database or hashing anything
+        if not login_throttle.allow(request.remote_addr, form.email.data):
+            raise ValidationError('Too many login attempts, please try again')
+
         user = db.session.query(User).filter_by(email=form.email.data).first()
         if not user:
             raise ValidationError('Inccorect Email or Password combination')
-        if not verify_and_update_password(field.data, user):
+
+        # Hashed on the bounded pool, an outdated hash is upgraded in the
+        # background rather than written in this request
+        try:
+            verified = hash_pool.verify(field.data, user)
+        except HashPoolBusy:
+            raise ValidationError('Too many login attempts, please try again')
+        if not verified:
             raise ValidationError('Inccorect Email or Password combination')
 
         login_user(user)
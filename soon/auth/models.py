@@ -6,14 +6,21 @@
 """
 
 from flask.ext.security import RoleMixin, UserMixin
+from soon.auth.users import invalidate_session_users
 from soon.ext import db
 from soon.db.mixins import CreateUpdateMixin
+from sqlalchemy import event
 from sqlalchemy.dialects import postgresql
 from wtforms.fields import PasswordField, TextField
 
 
 class User(db.Model, UserMixin, CreateUpdateMixin):
 
+    __table_args__ = (
+        # Keyset pagination of the admin table, email is already unique
+        db.Index('ix_user_created_id', 'created', 'id'),
+        db.Index('ix_user_last_login_at', 'last_login_at'))
+
     # Primary Key
     id = db.Column(db.Integer, primary_key=True)
 
@@ -93,6 +100,9 @@ class Role(db.Model, RoleMixin, CreateUpdateMixin):
 class UsersRoles(db.Model):
 
     __tablename__ = 'users_roles'
+    __table_args__ = (
+        # The primary key leads with user_id, this serves Role.users
+        db.Index('ix_users_roles_role_id', 'role_id'), )
 
     # Foreign Keys
 
@@ -104,3 +114,12 @@ class UsersRoles(db.Model):
         db.Integer,
         db.ForeignKey('role.id', ondelete='cascade'),
         primary_key=True)
+
+
+# Logged in users are cached with their roles, clear them on write
+event.listen(User, 'after_update', invalidate_session_users)
+event.listen(User, 'after_delete', invalidate_session_users)
+event.listen(Role, 'after_update', invalidate_session_users)
+event.listen(Role, 'after_delete', invalidate_session_users)
+event.listen(UsersRoles, 'after_insert', invalidate_session_users)
+event.listen(UsersRoles, 'after_delete', invalidate_session_users)
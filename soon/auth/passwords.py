@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: soon.auth.passwords
+   :synopsis: Password verification on a bounded pool of hashing threads,
+              outdated hashes are upgraded in the background
+"""
+
+import os
+import Queue
+import threading
+
+from flask import current_app
+from flask.ext.security.utils import encrypt_password, get_hmac
+from soon.exceptions import HashPoolBusy
+
+
+class Task(object):
+    """
+    A function queued on the pool, run within the context of the
+    application which submitted it. The submitting thread may wait for its
+    result.
+    """
+
+    def __init__(self, func, args, app):
+        self.func = func
+        self.args = args
+        self.app = app
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def run(self):
+        try:
+            self.result = self.func(*self.args)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done.set()
+
+    def wait(self, timeout):
+        """
+        Wait for the task to finish and return its result, raises
+        :py:class:`soon.exceptions.HashPoolBusy` when it is not done within
+        ``timeout`` seconds.
+
+        :param timeout: Seconds to wait
+        :type timeout: float
+
+        :returns: object -- Return value of the function
+        """
+
+        if not self.done.wait(timeout):
+            raise HashPoolBusy('Timed out waiting for a password hash')
+        if self.error is not None:
+            raise self.error
+
+        return self.result
+
+
+class HashPool(object):
+    """
+    A fixed number of threads computing password hashes, at most
+    ``PASSWORD_HASH_WORKERS`` hashes run at once per process however many
+    logins arrive together. Further logins wait in a queue of
+    ``PASSWORD_HASH_QUEUE`` places and are refused once it is full, so a
+    burst of attempts can not tie up every WSGI worker hashing.
+    """
+
+    def __init__(self, app=None):
+        self._queue = None
+        self._lock = threading.Lock()
+        self._pid = None
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Register the pool with the application
+
+        :param app: Flask application instance
+        :type app: flask.app.Flask
+        """
+
+        app.extensions['hash_pool'] = self
+
+    def _start(self, app):
+        """
+        Start the worker threads on first use in each process so they
+        survive forking servers.
+        """
+
+        with self._lock:
+            if self._queue is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._queue = Queue.Queue(app.config['PASSWORD_HASH_QUEUE'])
+            for _ in range(app.config['PASSWORD_HASH_WORKERS']):
+                worker = threading.Thread(
+                    target=self._work,
+                    args=(self._queue, ))
+                worker.daemon = True
+                worker.start()
+
+    def _work(self, queue):
+        while True:
+            task = queue.get()
+            with task.app.app_context():
+                task.run()
+            if task.error is not None and task.func is _rehash:
+                task.app.logger.error('Password hash task failed: {0!r}'.format(
+                    task.error))
+
+    def submit(self, func, *args):
+        """
+        Queue a function to run on the pool within an application context
+
+        :param func: Function to run
+        :type func: function
+
+        :raises: soon.exceptions.HashPoolBusy -- The queue is full
+
+        :returns: Task
+        """
+
+        app = current_app._get_current_object()
+        self._start(app)
+
+        task = Task(func, args, app)
+        try:
+            self._queue.put_nowait(task)
+        except Queue.Full:
+            raise HashPoolBusy('Too many password hashes queued')
+
+        return task
+
+    def verify(self, password, user):
+        """
+        Verify a password against a user's stored hash on the pool. When
+        the hash uses outdated settings it is upgraded by a further task,
+        the caller does not wait for it.
+
+        :param password: Plain text password
+        :type password: str
+
+        :param user: The user logging in
+        :type user: soon.auth.models.User
+
+        :raises: soon.exceptions.HashPoolBusy -- The pool is saturated
+
+        :returns: bool
+        """
+
+        verified, needs_update = self.submit(
+            _verify,
+            password,
+            user.password).wait(current_app.config['PASSWORD_HASH_TIMEOUT'])
+
+        if verified and needs_update:
+            try:
+                self.submit(_rehash, password, user.id, user.password)
+            except HashPoolBusy:
+                # Upgraded on a later login instead
+                pass
+
+        return verified
+
+
+def _verify(password, password_hash):
+    """
+    Returns whether the password matches the hash and whether the hash
+    should be upgraded, as Flask-Security's ``verify_and_update_password``
+    without writing to the user.
+    """
+
+    context = current_app.extensions['security'].pwd_context
+
+    if context.identify(password_hash) != 'plaintext':
+        password = get_hmac(password)
+
+    return (
+        context.verify(password, password_hash),
+        context.needs_update(password_hash))
+
+
+def _rehash(password, user_id, password_hash):
+    """
+    Store a new hash of the password with the current settings, unless the
+    password changed since it was verified.
+    """
+
+    from soon.auth.models import User
+    from soon.ext import db
+
+    User.query.filter_by(id=user_id, password=password_hash).update(
+        {'password': encrypt_password(password)},
+        synchronize_session=False)
+    db.session.commit()
@@ -6,7 +6,6 @@
 """
 
 from flask.blueprints import Blueprint
-from soon.auth.admin import UserAdminView
 
 
 blueprint = Blueprint(
@@ -16,10 +15,3 @@ blueprint = Blueprint(
     template_folder='templates')
 
 routes = []
-
-admin = [
-    UserAdminView(
-        name='Users',
-        url='users',
-        endpoint='admin.users')
-]
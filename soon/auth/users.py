@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: soon.auth.users
+   :synopsis: Loads the logged in user with its roles in one query, cached
+              per request and optionally for a few seconds per process
+"""
+
+import threading
+import time
+
+from flask import current_app, g
+from soon.db.events import on_commit
+from sqlalchemy.orm import joinedload, object_session, Session
+
+
+class SessionUsers(object):
+    """
+    Replaces the Flask-Login user loader registered by Flask-Security. The
+    user is loaded with its roles eagerly so ``current_user.is_admin`` and
+    the role needs added for every request cost a single query.
+
+    With ``USER_CACHE_TTL`` set users are also kept in process for that
+    many seconds as detached snapshots, each request merges a copy into its
+    own session without querying. The cache is cleared on any write to
+    ``User``, ``Role`` or ``UsersRoles`` in this process, other processes
+    pick up changes once their entry expires so keep the TTL short.
+    """
+
+    def __init__(self, app=None):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Register the loader with the application, must be called after
+        Flask-Security is initialised
+
+        :param app: Flask application instance
+        :type app: flask.app.Flask
+        """
+
+        app.extensions['session_users'] = self
+        app.login_manager.user_loader(self.load)
+
+    def query(self, user_id):
+        """
+        Query a user with its roles
+
+        :param user_id: Primary key of the user
+        :type user_id: int
+
+        :returns: soon.auth.models.User or None
+        """
+
+        from soon.auth.models import User
+
+        return User.query.options(joinedload(User.roles)).filter_by(
+            id=user_id).first()
+
+    def load(self, user_id):
+        """
+        Flask-Login user loader, returns the user for an id stored in the
+        session
+
+        :param user_id: Primary key of the user
+        :type user_id: unicode
+
+        :returns: soon.auth.models.User or None
+        """
+
+        from soon.ext import db
+
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return None
+
+        # Flask-Login loads once per request but the user may be reloaded
+        loaded = getattr(g, 'session_users', None)
+        if loaded is None:
+            loaded = g.session_users = {}
+        if user_id in loaded:
+            return loaded[user_id]
+
+        ttl = current_app.config['USER_CACHE_TTL']
+        entry = self._entries.get(user_id) if ttl else None
+
+        if entry is not None and entry[1] > time.time():
+            user = db.session.merge(entry[0], load=False)
+        else:
+            user = self.query(user_id)
+            if user is not None and ttl:
+                self.store(user_id, user, ttl)
+
+        loaded[user_id] = user
+
+        return user
+
+    def store(self, user_id, user, ttl):
+        """
+        Cache a detached snapshot of a freshly loaded user, it is never
+        attached to a session so commits can not expire it.
+        """
+
+        session = Session()
+        snapshot = session.merge(user, load=False)
+        session.expunge_all()
+
+        with self._lock:
+            if len(self._entries) >= \
+                    current_app.config['USER_CACHE_MAX_ENTRIES']:
+                self._entries.clear()
+            self._entries[user_id] = (snapshot, time.time() + ttl)
+
+    def invalidate(self):
+        """
+        Drop every cached user in this process
+        """
+
+        with self._lock:
+            self._entries.clear()
+
+
+def invalidate_session_users(mapper, connection, target):
+    """
+    SQLAlchemy mapper event listener, clears cached users when a user, role
+    or role membership is written, and again once the owning session's
+    transaction commits.
+
+    Args:
+        mapper (sqlalchemy.orm.mapper.Mapper): Mapper target of this event
+        connection (sqlalchemy.engine.Connection): The db connection session
+        target (object): The written instance
+    """
+
+    users = current_app.extensions.get('session_users')
+    if users is None:
+        return
+
+    users.invalidate()
+
+    # Cleared again on commit, dropping users loaded from the pre commit data
+    session = object_session(target)
+    if session is not None:
+        on_commit(session, 'session_users', users.invalidate)
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: soon.cache
+   :synopsis: In process cache of fully rendered responses for views which
+              opt in, invalidated by SQLAlchemy ORM events
+"""
+
+import hashlib
+import os
+import threading
+import time
+
+from collections import namedtuple, OrderedDict
+from functools import wraps
+
+from flask import current_app, request
+from soon.db.events import on_commit
+from sqlalchemy.orm import object_session
+
+
+#: A rendered response held in the cache
+CachedResponse = namedtuple('CachedResponse', [
+    'body',
+    'etag',
+    'mimetype',
+    'headers'])
+
+
+class ResponseCache(object):
+    """
+    Holds the rendered body and ETag of responses from views decorated with
+    :py:meth:`cached`. Entries are kept per process and cleared with
+    :py:meth:`invalidate`, which also touches a stamp file so other worker
+    processes drop their entries on their next request.
+
+    Responses rendered from a read replica soon after an invalidation are
+    not stored, the replica may not have the write yet.
+    """
+
+    def __init__(self, app=None):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._invalidated = None
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Register the cache with the application
+
+        :param app: Flask application instance
+        :type app: flask.app.Flask
+        """
+
+        app.extensions['response_cache'] = self
+
+    @property
+    def enabled(self):
+        return current_app.config['RESPONSE_CACHE_ENABLED']
+
+    def _read_stamp(self):
+        """
+        Returns the modification time of the configured stamp file or
+        None if no stamp file is configured / exists.
+
+        :returns: float or None
+        """
+
+        path = current_app.config['RESPONSE_CACHE_STAMP']
+        if not path:
+            return None
+
+        try:
+            return os.stat(path).st_mtime
+        except OSError:
+            return None
+
+    def _sync(self):
+        """
+        Drop local entries if another process has invalidated the cache
+        since they were stored.
+        """
+
+        stamp = self._read_stamp()
+        if stamp != self._stamp:
+            with self._lock:
+                self._entries.clear()
+                self._stamp = stamp
+                self._invalidated = max(self._invalidated, stamp)
+
+    def make_key(self):
+        """
+        Build the cache key for the current request. The query string is
+        deliberately ignored so arbitrary parameters can not be used to
+        fill the cache.
+
+        :returns: tuple -- endpoint, path
+        """
+
+        return request.endpoint, request.path
+
+    def get(self, key):
+        """
+        Return a cached response for the key or None
+
+        :param key: Cache key
+        :type key: tuple
+
+        :returns: CachedResponse or None
+        """
+
+        self._sync()
+
+        return self._entries.get(key)
+
+    def set(self, key, response):
+        """
+        Store the body of a response object in the cache
+
+        :param key: Cache key
+        :type key: tuple
+
+        :param response: The rendered response
+        :type response: flask.wrappers.Response
+
+        :returns: CachedResponse -- The stored entry
+        """
+
+        body = response.get_data()
+        etag = response.get_etag()[0] or hashlib.md5(body).hexdigest()
+
+        headers = [
+            (k, v) for k, v in response.headers.items()
+            if k.lower() not in ('content-length', 'content-type', 'etag',
+                                 'set-cookie')]
+
+        entry = CachedResponse(body, etag, response.mimetype, headers)
+
+        with self._lock:
+            self._entries[key] = entry
+            while len(self._entries) > \
+                    current_app.config['RESPONSE_CACHE_MAX_ENTRIES']:
+                self._entries.popitem(last=False)
+
+        return entry
+
+    def invalidate(self):
+        """
+        Clear all cached responses in this process and touch the stamp file,
+        if configured, so other processes clear theirs too.
+        """
+
+        with self._lock:
+            self._entries.clear()
+            self._invalidated = time.time()
+
+        path = current_app.config.get('RESPONSE_CACHE_STAMP')
+        if path:
+            with open(path, 'a'):
+                os.utime(path, None)
+            self._stamp = self._read_stamp()
+
+    def cacheable(self):
+        """
+        Returns False if the current request reads a read replica which may
+        not have the data of the last invalidation yet
+
+        :returns: bool
+        """
+
+        replicas = current_app.extensions.get('read_replicas')
+
+        return replicas is None or not replicas.lagging(self._invalidated)
+
+    def build_response(self, entry):
+        """
+        Create a new response object from a cached entry, made conditional
+        to the current request so a matching ETag gets a 304.
+
+        :param entry: The cached response
+        :type entry: CachedResponse
+
+        :returns: flask.wrappers.Response
+        """
+
+        response = current_app.response_class(
+            entry.body,
+            mimetype=entry.mimetype,
+            headers=entry.headers)
+        response.set_etag(entry.etag)
+
+        return response.make_conditional(request)
+
+    def cached(self, view):
+        """
+        View decorator which serves the response from the cache when
+        available, else renders the view and caches the result. Only
+        successful ``GET`` and ``HEAD`` responses are cached, an ETag set by
+        the view is kept else one is generated from the body. Class based
+        views opt in by adding this to their ``decorators`` list:
+
+            class HomeView(ModelListView):
+                decorators = [response_cache.cached]
+
+        :param view: View function
+        :type view: function
+
+        :returns: function -- Decorated view
+        """
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not self.enabled or request.method not in ('GET', 'HEAD'):
+                return view(*args, **kwargs)
+
+            key = self.make_key()
+            entry = self.get(key)
+
+            if entry is None:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200 or \
+                        response.direct_passthrough or not self.cacheable():
+                    return response
+                entry = self.set(key, response)
+
+            return self.build_response(entry)
+
+        return wrapper
+
+
+def invalidate_response_cache(mapper, connection, target):
+    """
+    SQLAlchemy mapper event listener, clears the response cache when an
+    instance which is rendered in cached views is written. It is cleared
+    again once the owning session's transaction commits, dropping anything
+    rendered from the pre commit data in the meantime.
+
+    Args:
+        mapper (sqlalchemy.orm.mapper.Mapper): Mapper target of this event
+        connection (sqlalchemy.engine.Connection): The db connection session
+        target (object): The written instance
+    """
+
+    cache = current_app.extensions.get('response_cache')
+    if cache is None:
+        return
+
+    cache.invalidate()
+
+    session = object_session(target)
+    if session is not None:
+        on_commit(session, 'response_cache', cache.invalidate)
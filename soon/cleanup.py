@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: soon.cleanup
+   :synopsis: Deferred deletion of files released by database writes, acted
+              on after commit in batches on a background thread or by the
+              ``manage.py sweep_files`` command
+"""
+
+import os
+import Queue
+import threading
+
+from flask import current_app
+from soon.db.events import on_commit
+
+
+class FileCleanup(object):
+    """
+    Queue of files which may no longer be needed. Model events call
+    :py:meth:`schedule` during a flush, nothing touches the file system
+    then. Once the transaction commits the files are queued for a worker
+    thread which hands them, in batches, to the handler registered for
+    their store. The handler checks which are still referenced and deletes
+    the rest, other than files modified in the last ``FILE_CLEANUP_GRACE``
+    seconds which an upload not yet committed may share. A rolled back
+    transaction discards its files.
+
+    Files queued when a process exits, files kept for their grace period,
+    or all of them when ``FILE_CLEANUP_WORKER`` is disabled, are found by
+    :py:meth:`sweep`.
+    """
+
+    def __init__(self, app=None):
+        self._handlers = {}
+        self._queue = Queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._pid = None
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Register the cleanup queue with the application
+
+        :param app: Flask application instance
+        :type app: flask.app.Flask
+        """
+
+        app.extensions['file_cleanup'] = self
+
+    def register(self, store, handler):
+        """
+        Register the function releasing files of a store, it is passed a
+        list of blob names relative to ``MEDIA_ROOT`` and must only delete
+        those which are no longer referenced:
+
+            file_cleanup.register(spec_store, release_specs)
+
+        :param store: Storage the files belong to
+        :type store: soon.storage.ContentStore
+
+        :param handler: Function releasing a batch of files
+        :type handler: function
+        """
+
+        self._handlers[store.directory] = (store, handler)
+
+    def schedule(self, session, name):
+        """
+        Record a file released by the session's current transaction
+
+        :param session: The flushing session
+        :type session: sqlalchemy.orm.session.Session
+
+        :param name: Blob name relative to ``MEDIA_ROOT``
+        :type name: str
+        """
+
+        on_commit(session, 'file_cleanup', self.enqueue, name)
+
+    def enqueue(self, names):
+        """
+        Queue committed file releases for the worker thread, which is
+        started on first use in each process so it survives forking servers.
+
+        :param names: Blob names relative to ``MEDIA_ROOT``
+        :type names: iterable
+        """
+
+        if not current_app.config['FILE_CLEANUP_WORKER']:
+            return
+
+        app = current_app._get_current_object()
+
+        with self._lock:
+            if self._worker is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._worker = threading.Thread(
+                    target=self._work,
+                    args=(app, ))
+                self._worker.daemon = True
+                self._worker.start()
+
+        for name in names:
+            self._queue.put(name)
+
+    def wait(self):
+        """
+        Block until every queued file has been processed
+        """
+
+        self._queue.join()
+
+    def _work(self, app):
+        while True:
+            batch = [self._queue.get()]
+            try:
+                while len(batch) < app.config['FILE_CLEANUP_BATCH_SIZE']:
+                    batch.append(self._queue.get_nowait())
+            except Queue.Empty:
+                pass
+
+            try:
+                with app.app_context():
+                    self.release(batch)
+            except Exception:
+                app.logger.exception('File cleanup failed')
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def release(self, names):
+        """
+        Pass files to the handlers of their stores
+
+        :param names: Blob names relative to ``MEDIA_ROOT``
+        :type names: list
+        """
+
+        grouped = {}
+        for name in names:
+            grouped.setdefault(name.split('/', 1)[0], []).append(name)
+
+        for directory, batch in grouped.items():
+            if directory in self._handlers:
+                self._handlers[directory][1](batch)
+
+    def sweep(self):
+        """
+        Release every file of the registered stores which is older than
+        ``FILE_CLEANUP_GRACE`` seconds, catching files the worker never
+        processed. Younger files may belong to uploads not yet committed.
+
+        :returns: int -- Number of files checked
+        """
+
+        size = current_app.config['FILE_CLEANUP_BATCH_SIZE']
+        grace = current_app.config['FILE_CLEANUP_GRACE']
+        checked = 0
+
+        for store, handler in self._handlers.values():
+            names = list(store.blobs(grace))
+            for i in range(0, len(names), size):
+                handler(names[i:i + size])
+            checked += len(names)
+
+        return checked
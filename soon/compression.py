@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: soon.compression
+   :synopsis: Pre compressed gzip / brotli siblings of static files, served by
+              Accept-Encoding negotiation, and optional compression of
+              dynamic HTML responses
+"""
+
+import gzip
+import io
+import mimetypes
+import os
+import threading
+
+from collections import OrderedDict
+
+from flask import current_app, request, send_file
+from flask.helpers import safe_join
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Content-Encoding and file extension of pre compressed siblings, in order of
+# preference
+ENCODINGS = [
+    ('br', '.br'),
+    ('gzip', '.gz'),
+]
+
+
+def gzip_compress(data, level=9):
+    """
+    Gzip compress data, the header time stamp is zeroed so output is
+    reproducible between builds.
+
+    :param data: Data to compress
+    :type data: str
+
+    :param level: Compression level
+    :type level: int
+
+    :returns: str -- Compressed data
+    """
+
+    buf = io.BytesIO()
+    with gzip.GzipFile(
+            fileobj=buf,
+            mode='wb',
+            compresslevel=level,
+            mtime=0) as f:
+        f.write(data)
+
+    return buf.getvalue()
+
+
+def precompress(path):
+    """
+    Write ``.gz`` and, when the ``brotli`` package is installed, ``.br``
+    siblings of a file. Siblings which would not be smaller are not written.
+
+    :param path: Absolute path of the file
+    :type path: str
+
+    :returns: list -- Paths of the written siblings
+    """
+
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    compressors = {'.gz': gzip_compress}
+    if brotli is not None:
+        compressors['.br'] = brotli.compress
+
+    written = []
+
+    for encoding, ext in ENCODINGS:
+        if ext not in compressors:
+            continue
+        compressed = compressors[ext](data)
+        if len(compressed) >= len(data):
+            continue
+        with open(path + ext, 'wb') as f:
+            f.write(compressed)
+        written.append(path + ext)
+
+    return written
+
+
+def is_compressible(app, name):
+    """
+    Returns True if the file type should be pre compressed
+
+    :param app: Flask application instance
+    :type app: flask.app.Flask
+
+    :param name: File name
+    :type name: str
+
+    :returns: bool
+    """
+
+    return os.path.splitext(name)[1].lower() in \
+        app.config['COMPRESS_EXTENSIONS']
+
+
+class Compression(object):
+    """
+    Serves pre compressed siblings of static files to clients which accept
+    them, so no compression happens per request. When ``COMPRESS_DYNAMIC``
+    is enabled HTML responses larger than ``COMPRESS_MIN_SIZE`` are gzipped
+    on the fly, the compressed body is memoized by ETag so responses from
+    the response cache are only compressed once. Compressed responses get
+    their own ETag, the identity ETag with a ``-gzip`` suffix, as they are
+    a different byte stream.
+    """
+
+    def __init__(self, app=None):
+        self._memo = OrderedDict()
+        self._lock = threading.Lock()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Register the compression hooks with the application
+
+        :param app: Flask application instance
+        :type app: flask.app.Flask
+        """
+
+        app.extensions['compression'] = self
+        app.before_request(self.serve_precompressed)
+        app.after_request(self.vary_static)
+        app.after_request(self.compress_response)
+
+    def static_root(self):
+        """
+        Returns the directory static files are served from, the collected
+        static root once assets are collected
+        """
+
+        assets = current_app.extensions.get('assets')
+
+        return (assets and assets.static_root) or current_app.static_folder
+
+    def serve_precompressed(self):
+        """
+        ``before_request`` hook returning the pre compressed sibling of the
+        requested static file if one exists and the client accepts its
+        encoding. Media is left to its view, which authorises each file.
+        """
+
+        if request.method not in ('GET', 'HEAD') or \
+                request.endpoint != 'static':
+            return None
+
+        filename = request.view_args.get('filename')
+        path = safe_join(self.static_root(), filename)
+
+        for encoding, ext in ENCODINGS:
+            if not request.accept_encodings[encoding]:
+                continue
+            if not os.path.isfile(path + ext):
+                continue
+
+            mimetype = mimetypes.guess_type(filename)[0] or \
+                'application/octet-stream'
+            response = send_file(
+                path + ext,
+                mimetype=mimetype,
+                conditional=True)
+            response.headers['Content-Encoding'] = encoding
+            response.vary.add('Accept-Encoding')
+
+            return response
+
+        return None
+
+    def vary_static(self, response):
+        """
+        ``after_request`` hook adding ``Vary: Accept-Encoding`` to static
+        files which may have pre compressed siblings, whichever encoding is
+        sent, so shared caches keep the identity and compressed responses
+        apart.
+        """
+
+        if request.endpoint == 'static' and is_compressible(
+                current_app,
+                request.view_args.get('filename', '')):
+            response.vary.add('Accept-Encoding')
+
+        return response
+
+    def compress_response(self, response):
+        """
+        ``after_request`` hook gzipping dynamic responses when enabled
+        """
+
+        config = current_app.config
+
+        if not config['COMPRESS_DYNAMIC']:
+            return response
+        if response.mimetype not in config['COMPRESS_MIMETYPES']:
+            return response
+
+        response.vary.add('Accept-Encoding')
+
+        if response.status_code != 200 or response.direct_passthrough or \
+                'Content-Encoding' in response.headers or \
+                not request.accept_encodings['gzip']:
+            return response
+
+        data = response.get_data()
+        if len(data) < config['COMPRESS_MIN_SIZE']:
+            return response
+
+        etag, weak = response.get_etag()
+        compressed = self._memo.get(etag) if etag else None
+
+        if compressed is None:
+            compressed = gzip_compress(data, config['COMPRESS_LEVEL'])
+            if etag:
+                with self._lock:
+                    self._memo[etag] = compressed
+                    while len(self._memo) > config['COMPRESS_MEMO_SIZE']:
+                        self._memo.popitem(last=False)
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = 'gzip'
+
+        if etag:
+            # The view compared If-None-Match with the identity ETag, clients
+            # holding the gzipped response send this one
+            response.set_etag(etag + '-gzip', weak)
+            response.make_conditional(request)
+
+        return response
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: soon.conditional
+   :synopsis: Conditional GET support, answering requests with 304 Not
+              Modified before the view renders anything
+"""
+
+import hashlib
+import os
+
+from datetime import datetime
+from functools import wraps
+
+from flask import current_app, request
+from werkzeug.http import is_resource_modified
+
+
+def make_etag(*parts):
+    """
+    Build an ETag from the given parts salted with ``ETAG_SALT`` so all
+    validators change when a new release is deployed.
+
+    :returns: str -- Hex digest
+    """
+
+    value = ':'.join(
+        [current_app.config.get('ETAG_SALT', '')] +
+        ['{0}'.format(part) for part in parts])
+
+    return hashlib.md5(value.encode('utf-8')).hexdigest()
+
+
+def template_validators(*names):
+    """
+    Returns a validators function for :py:func:`conditional` for pages
+    rendered from templates alone, the ETag and Last-Modified follow the
+    most recently modified of the named templates and the collected assets
+    version, so changing either changes the page:
+
+        class peabody(TemplateView):
+            decorators = [conditional(template_validators(
+                'peabody.html',
+                'layout/base.html'))]
+
+    :param names: Names of the page's template and those it extends or
+                  includes
+    :type names: tuple
+
+    :returns: function
+    """
+
+    def validators():
+        env = current_app.jinja_env
+        mtime = int(max(
+            os.path.getmtime(env.get_template(name).filename)
+            for name in names))
+
+        assets = current_app.extensions.get('assets')
+        version = assets.version if assets is not None else None
+
+        etag = make_etag(*(names + (mtime, version)))
+
+        return etag, datetime.utcfromtimestamp(mtime)
+
+    return validators
+
+
+def set_validators(response, etag, last_modified):
+    """
+    Set ETag, Last-Modified and Cache-Control headers on a response, clients
+    must revalidate on each visit which is cheap thanks to 304 responses.
+
+    :param response: Response object
+    :type response: flask.wrappers.Response
+
+    :param etag: Unquoted ETag value
+    :type etag: str
+
+    :param last_modified: Last modification time
+    :type last_modified: datetime.datetime or None
+    """
+
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.cache_control.no_cache = True
+
+
+def conditional(validators):
+    """
+    View decorator which calls ``validators`` to get an ``(etag,
+    last_modified)`` tuple and returns 304 Not Modified without calling the
+    view when the client copy is current. Class based views use it in their
+    ``decorators`` list:
+
+        class HomeView(ModelListView):
+            decorators = [conditional(home_validators)]
+
+    :param validators: Callable returning a tuple of etag, last_modified
+    :type validators: function
+
+    :returns: function -- View decorator
+    """
+
+    def decorator(view):
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(*args, **kwargs)
+
+            etag, last_modified = validators()
+
+            if not is_resource_modified(
+                    request.environ,
+                    etag=etag,
+                    last_modified=last_modified):
+                response = current_app.response_class(status=304)
+                set_validators(response, etag, last_modified)
+                return response
+
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                set_validators(response, etag, last_modified)
+
+            return response
+
+        return wrapper
+
+    return decorator
@@ -6,6 +6,7 @@
 """
 
 import os
+import tempfile
 
 # Paths
 
@@ -13,22 +14,82 @@ BASE_DIR = os.path.join(
     os.path.dirname(os.path.dirname(__file__)),
     '..')
 
+# Release
+
+try:
+    VERSION = open(os.path.join(BASE_DIR, 'VERSION.txt')).read().strip()
+except IOError:
+    VERSION = None
+
+# Salts generated ETags so they change when a new release is deployed
+ETAG_SALT = VERSION or ''
+
 # Debug
 
 DEBUG = True
 
+# Application
+
+# 'full', or 'public' to leave out the admin, Gravatar and Flask-Collect in
+# processes which only serve the public site
+APP_PROFILE = os.environ.get('SOON_APP_PROFILE') or 'full'
+
 # Security
 
 SECRET_KEY = 'changeme'
 SECURITY_TRACKABLE = True
 SECURITY_PASSWORD_HASH = 'sha512_crypt'
 SECURITY_PASSWORD_SALT = SECRET_KEY
+# Concurrent password hashes per process and logins allowed to wait for one
+PASSWORD_HASH_WORKERS = 2
+PASSWORD_HASH_QUEUE = 16
+# Seconds a login waits for its password hash before it is refused
+PASSWORD_HASH_TIMEOUT = 10
+# Login attempts allowed per client IP and per email: (burst, period seconds)
+LOGIN_THROTTLE_ENABLED = True
+LOGIN_THROTTLE_LIMITS = {
+    'ip': (20, 300),
+    'email': (5, 300)}
+# Buckets kept in process, or path of a SQLite file shared by all workers
+LOGIN_THROTTLE_MAX_KEYS = 10000
+LOGIN_THROTTLE_STORAGE = None
+# Seconds logged in users are cached per process, 0 queries them per request
+USER_CACHE_TTL = 0
+# Most users cached per process, the cache is emptied when full
+USER_CACHE_MAX_ENTRIES = 256
 
 # Database
 
-DEFAULT_DATABASE_URI = 'sqlite://:memory:'
+DEFAULT_DATABASE_URI = 'sqlite://'
 SQLALCHEMY_DATABASE_URI = os.environ.get('SQLALCHEMY_DATABASE_URI') or \
     DEFAULT_DATABASE_URI
+# Connections kept open per process, and opened beyond that under load. Each
+# worker process holds up to POOL_SIZE + MAX_OVERFLOW, keep the total below
+# PostgreSQL's max_connections. Also read from the environment by load_config.
+SQLALCHEMY_POOL_SIZE = 5
+SQLALCHEMY_MAX_OVERFLOW = 10
+# Seconds to wait for a connection before failing the request
+SQLALCHEMY_POOL_TIMEOUT = 10
+# Seconds after which connections are replaced, below any server idle timeout
+SQLALCHEMY_POOL_RECYCLE = 1800
+# Test connections with SELECT 1 when checked out, replacing dropped ones
+SQLALCHEMY_POOL_PRE_PING = False
+# Read replicas queried round robin by read only views, comma separated in
+# the environment. Clients read the primary for a few seconds after writing.
+SQLALCHEMY_REPLICA_URIS = []
+REPLICA_STICKY_SECONDS = 10
+# Count and time the queries of each request, logged per request and sent as
+# X-Query-Count / X-Query-Time headers when QUERY_STATS_HEADERS (None: DEBUG)
+QUERY_STATS_ENABLED = True
+QUERY_STATS_HEADERS = None
+# Slowest statements kept per request, seconds after which one, or the
+# request's queries together, are logged as warnings
+QUERY_STATS_SLOWEST = 3
+QUERY_SLOW_THRESHOLD = 0.25
+# Rows per batch / transaction of manage.py import_rows and export_rows
+TRANSFER_BATCH_SIZE = 5000
+# Processes hashing imported passwords, None for the number of CPUs
+TRANSFER_HASH_PROCESSES = None
 
 # Blueprints
 
@@ -36,10 +97,103 @@ BLUEPRINTS = [
     'soon.auth',
     'soon.jobs',
 ]
+# Modules of each blueprint, written by manage.py blueprint_manifest. Without
+# it they are found on every start up.
+BLUEPRINT_MANIFEST = os.path.join(BASE_DIR, 'blueprints.json')
 
 # Media (Uploads etc)
 
-# URL to serve media from - used for DEBUG=True only
+# URL to serve media from
 MEDIA_URL = '/media'
 # Absaolute path for actually saving files
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# How media is served: 'app', 'x-accel-redirect' (nginx) or 'x-sendfile'
+# (Apache / lighttpd). Required outside DEBUG, where None means 'app'.
+MEDIA_SERVE = None
+# Internal nginx location aliased to MEDIA_ROOT for x-accel-redirect
+MEDIA_ACCEL_PREFIX = '/protected-media'
+# Range requests: most ranges honoured per request, read size when streaming
+MEDIA_MAX_RANGES = 16
+MEDIA_CHUNK_SIZE = 64 * 1024
+# Delete files released by deleted / updated rows on a background thread after
+# commit, else leave them to manage.py sweep_files
+FILE_CLEANUP_WORKER = True
+FILE_CLEANUP_BATCH_SIZE = 100
+# Seconds a file must be unmodified before manage.py sweep_files checks it
+FILE_CLEANUP_GRACE = 3600
+
+# Response Cache
+
+# Cache fully rendered responses of views which opt in
+RESPONSE_CACHE_ENABLED = True
+# Maximum number of rendered responses kept per process
+RESPONSE_CACHE_MAX_ENTRIES = 128
+# File touched on invalidation so all worker processes drop their cache
+RESPONSE_CACHE_STAMP = os.path.join(
+    tempfile.gettempdir(),
+    'soon-response-cache.stamp')
+
+# Templates
+
+# Directory compiled templates are cached in, shared by all processes and
+# filled by manage.py compile_templates. None compiles them in each process.
+TEMPLATE_BYTECODE_DIR = os.path.join(BASE_DIR, 'template_cache')
+
+# Snapshots
+
+# Directory pre rendered template only pages are written to
+SNAPSHOT_ROOT = os.path.join(BASE_DIR, 'snapshots')
+# Serve snapshots from the application rather than rendering templates
+SNAPSHOT_SERVE = False
+
+# Static Assets
+
+# Static files are collected, bundled and fingerprinted with manage.py collect
+COLLECT_STATIC_ROOT = os.path.join(BASE_DIR, 'collected_static')
+COLLECT_STORAGE = 'soon.assets.storage'
+# Maps original to fingerprinted file names, relative to COLLECT_STATIC_ROOT
+ASSETS_MANIFEST = 'manifest.json'
+# Bundled files, in order, relative to the static folder
+ASSET_BUNDLES = {
+    'css/site.css': [
+        'css/bootstrap.min.css',
+        'css/soon.css',
+    ],
+    'js/site.js': [
+        'js/bootstrap.min.js',
+        'js/stellar.js',
+        'js/jquery.easing.1.3.js',
+    ],
+}
+# Cache lifetime of fingerprinted files, in seconds
+ASSETS_MAX_AGE = 60 * 60 * 24 * 365
+
+# Responsive Images
+
+# Directories, relative to the static folder, to generate image variants for
+IMAGE_VARIANT_DIRS = ['img/folio']
+# Widths, in pixels, variants are generated at when narrower than the original
+IMAGE_WIDTHS = [480, 768, 1200]
+# Lists the widths generated for each image, relative to the static folder
+IMAGE_VARIANTS_MANIFEST = 'img/variants.json'
+# Media query selecting the mobile version of art directed images
+IMAGE_MOBILE_MEDIA = '(max-width: 767px)'
+# Narrowest viewport, in pixels, given background images in place of their
+# mobile version, the first width outside IMAGE_MOBILE_MEDIA
+IMAGE_BACKGROUND_MIN_WIDTH = 768
+
+# Compression
+
+# File types given pre compressed .gz / .br siblings by manage.py collect
+COMPRESS_EXTENSIONS = [
+    '.css', '.js', '.json', '.html', '.svg', '.txt', '.xml', '.ico']
+# Gzip dynamic responses, leave off when the front proxy compresses
+COMPRESS_DYNAMIC = False
+# Mime types of dynamic responses to gzip
+COMPRESS_MIMETYPES = ['text/html']
+# Responses smaller than this, in bytes, are not worth compressing
+COMPRESS_MIN_SIZE = 1024
+# Gzip level for dynamic responses
+COMPRESS_LEVEL = 6
+# Number of compressed bodies memoized by ETag
+COMPRESS_MEMO_SIZE = 32
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: soon.db.events
+   :synopsis: Callbacks deferred until a session's transaction commits,
+              discarded when it rolls back
+"""
+
+from collections import OrderedDict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+# Session info key holding the callbacks of the current transaction
+SESSION_CALLBACKS_KEY = 'on_commit'
+
+
+def on_commit(session, key, callback, *values):
+    """
+    Call ``callback`` once the session's current transaction commits, for
+    work which must only happen if the writes it follows are kept. Callbacks
+    are keyed so however many writes register one it runs once, with the
+    set of every value registered under its key when any are given:
+
+        on_commit(session, 'response_cache', cache.invalidate)
+        on_commit(session, 'file_cleanup', cleanup.enqueue, name)
+
+    A rolled back transaction discards its callbacks.
+
+    :param session: The session writing
+    :type session: sqlalchemy.orm.session.Session
+
+    :param key: Identifies the callback within the transaction
+    :type key: str
+
+    :param callback: Function to call after commit
+    :type callback: function
+
+    :param values: Values collected for the callback
+    :type values: tuple
+    """
+
+    callbacks = session.info.setdefault(SESSION_CALLBACKS_KEY, OrderedDict())
+    collected = callbacks.setdefault(key, (callback, set()))[1]
+    collected.update(values)
+
+
+@event.listens_for(Session, 'after_commit')
+def _session_after_commit(session):
+    callbacks = session.info.pop(SESSION_CALLBACKS_KEY, None)
+    if not callbacks:
+        return
+
+    for callback, values in callbacks.values():
+        if values:
+            callback(values)
+        else:
+            callback()
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _session_after_soft_rollback(session, previous_transaction):
+    session.info.pop(SESSION_CALLBACKS_KEY, None)
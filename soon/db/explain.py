@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: soon.db.explain
+   :synopsis: Query plans of the application's known queries, flagging those
+              which scan whole tables
+"""
+
+import datetime
+
+from collections import namedtuple
+
+from soon.ext import db
+from sqlalchemy import text, tuple_
+from sqlalchemy.orm import joinedload
+
+
+#: A query the application runs, ``scans`` is True when reading the whole
+#: table is expected, or the names of the database dialects it is expected on
+KnownQuery = namedtuple('KnownQuery', ['name', 'query', 'scans'])
+
+#: Result of explaining a known query
+Plan = namedtuple('Plan', ['name', 'lines', 'flagged'])
+
+
+def known_queries():
+    """
+    Returns the queries issued by the site, admin and background tasks with
+    representative parameters
+
+    :returns: list -- KnownQuery tuples
+    """
+
+    from soon.auth.models import Role, User, UsersRoles
+    from soon.jobs.models import Job
+
+    now = datetime.datetime.utcnow()
+
+    return [
+        KnownQuery(
+            'Home page jobs',
+            Job.query,
+            True),
+        KnownQuery(
+            'Job freshness',
+            db.session.query(db.func.max(Job.updated), db.func.count(Job.id)),
+            True),
+        KnownQuery(
+            'Latest job update',
+            db.session.query(db.func.max(Job.updated)),
+            False),
+        KnownQuery(
+            'Media spec authorisation',
+            db.session.query(db.exists().where(Job.spec == u'jobs/spec.pdf')),
+            False),
+        KnownQuery(
+            'Job spec references',
+            db.session.query(Job.spec).filter(Job.spec.like(u'jobs/abc/%')),
+            # SQLite's LIKE is case insensitive so can not use the index
+            ('sqlite', )),
+        KnownQuery(
+            'Jobs of a user',
+            Job.query.filter_by(user_id=1),
+            False),
+        KnownQuery(
+            'Admin jobs by created',
+            Job.query.filter(tuple_(Job.created, Job.id) < (now, 1)).order_by(
+                Job.created.desc(), Job.id.desc()).limit(31),
+            False),
+        KnownQuery(
+            'Admin jobs by title',
+            Job.query.filter(tuple_(Job.title, Job.id) > (u'a', 1)).order_by(
+                Job.title, Job.id).limit(31),
+            False),
+        KnownQuery(
+            'Admin users by created',
+            User.query.filter(tuple_(User.created, User.id) < (now, 1))
+            .order_by(User.created.desc(), User.id.desc()).limit(31),
+            False),
+        KnownQuery(
+            'Users by last login',
+            User.query.order_by(User.last_login_at.desc()).limit(31),
+            False),
+        KnownQuery(
+            'Login user by email',
+            User.query.filter_by(email='admin@example.com'),
+            False),
+        KnownQuery(
+            'Session user with roles',
+            User.query.options(joinedload(User.roles)).filter_by(id=1),
+            # SQLAlchemy rewrites the nested roles join into a subquery for
+            # SQLite, which materialises it
+            ('sqlite', )),
+        KnownQuery(
+            'Users of a role',
+            db.session.query(UsersRoles).filter_by(role_id=1),
+            False),
+        KnownQuery(
+            'Role by name',
+            Role.query.filter_by(name='admin'),
+            False),
+    ]
+
+
+def explain(query):
+    """
+    Returns the plan of a query as a list of lines. PostgreSQL plans are
+    made with sequential scans disabled so a remaining ``Seq Scan`` means
+    no index can serve the query, rather than the planner preferring a scan
+    of a small table.
+
+    :param query: The query to explain
+    :type query: sqlalchemy.orm.query.Query
+
+    :returns: list -- Plan lines
+    """
+
+    statement = query.with_labels().statement
+    connection = db.session.connection()
+    dialect = connection.dialect.name
+    compiled = statement.compile(dialect=connection.dialect)
+
+    if dialect == 'postgresql':
+        connection.execute(text('SET LOCAL enable_seqscan = off'))
+        prefix = 'EXPLAIN '
+    elif dialect == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    else:
+        prefix = 'EXPLAIN '
+
+    # Executed as driver SQL, the statement is already in its param style
+    params = compiled.construct_params()
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+
+    rows = connection.execute(prefix + unicode(compiled), params)
+
+    return [u' '.join(unicode(v) for v in row) for row in rows]
+
+
+def is_scan(line):
+    """
+    Returns True if a plan line reads a whole table
+
+    :param line: Plan line
+    :type line: unicode
+
+    :returns: bool
+    """
+
+    # PostgreSQL
+    if 'Seq Scan' in line:
+        return True
+
+    # SQLite, SCAN ... USING INDEX reads an index in order
+    words = line.split()
+
+    return 'SCAN' in words and 'USING' not in words and \
+        'CONSTANT' not in words
+
+
+def explain_known():
+    """
+    Explain every known query, flagging unexpected full table scans
+
+    :returns: list -- Plan tuples
+    """
+
+    plans = []
+    dialect = db.session.connection().dialect.name
+
+    try:
+        for known in known_queries():
+            lines = explain(known.query)
+            expected = known.scans is True or dialect in (known.scans or ())
+            flagged = not expected and any(is_scan(l) for l in lines)
+            plans.append(Plan(known.name, lines, flagged))
+    finally:
+        db.session.rollback()
+
+    return plans
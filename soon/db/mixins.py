@@ -7,7 +7,14 @@
 
 import datetime
 
+from collections import OrderedDict
+
 from soon.ext import db
+from sqlalchemy import and_, or_, PrimaryKeyConstraint, tuple_
+from sqlalchemy import UniqueConstraint
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import Insert
 
 
 class CreateUpdateMixin(object):
@@ -24,9 +31,73 @@ class CreateUpdateMixin(object):
         onupdate=datetime.datetime.utcnow)
 
 
+class InsertDoNothing(Insert):
+    """
+    ``INSERT`` which skips rows violating a unique constraint, rendered as
+    ``INSERT ... ON CONFLICT DO NOTHING`` on PostgreSQL 9.5+
+    """
+
+    pass
+
+
+@compiles(InsertDoNothing, 'postgresql')
+def _compile_insert_do_nothing(element, compiler, **kw):
+    sql = compiler.visit_insert(element, **kw)
+
+    # The conflict clause goes between VALUES and RETURNING
+    if element._returning:
+        head, returning = sql.rsplit(' RETURNING ', 1)
+        return '{0} ON CONFLICT DO NOTHING RETURNING {1}'.format(
+            head,
+            returning)
+
+    return sql + ' ON CONFLICT DO NOTHING'
+
+
+def column_defaults(table, row):
+    """
+    Returns a copy of a row with Python side column defaults filled in, a
+    multiple ``VALUES`` insert does not apply them itself.
+
+    :param table: The table the row is inserted into
+    :type table: sqlalchemy.schema.Table
+
+    :param row: Column values keyed by column name
+    :type row: dict
+
+    :raises: ValueError -- A default can not be computed, e.g one needing a
+             request outside of one
+
+    :returns: dict
+    """
+
+    row = dict(row)
+
+    for column in table.c:
+        default = column.default
+        if column.key in row or default is None:
+            continue
+        if default.is_scalar:
+            row[column.key] = default.arg
+        elif default.is_callable:
+            try:
+                row[column.key] = default.arg(None)
+            except (AttributeError, RuntimeError):
+                # Defaults such as the logged in user need a request
+                raise ValueError(
+                    'No value for {0}.{1} and its default can not be '
+                    'computed here'.format(table.name, column.key))
+
+    return row
+
+
 class GetOrCreateMixin(object):
     """
-    Mixin provides functions for django style get_or_create functionality
+    Mixin provides functions for django style get_or_create functionality.
+    The keyword arguments looked up should be covered by a unique
+    constraint, concurrent callers creating the same row then both get the
+    one row rather than a duplicate or an error. Without one rows are
+    selected before inserting, which concurrent callers may race.
     """
 
     @classmethod
@@ -43,14 +114,166 @@ class GetOrCreateMixin(object):
         :returns: tuple -- Bool, instance
         """
 
-        instance = db.session.query(kls).filter_by(**kwargs).first()
-        if instance:
-            return True, instance
-
-        instance = kls(**kwargs)
+        existed, instance = kls.get_or_create_many([kwargs])[0]
 
         if commit:
-            db.session.add(instance)
             db.session.commit()
 
-        return False, instance
+        return existed, instance
+
+    @classmethod
+    def get_or_create_many(kls, rows):
+        """
+        Get or create an instance for each of a list of dicts of key=value
+        pairs, all using the same keys. Nothing is committed. Returns a list
+        of (existed, instance) tuples in the order of ``rows``.
+
+        On PostgreSQL, when a unique constraint or index is on exactly the
+        looked up columns, every row is inserted by one ``INSERT ... ON
+        CONFLICT DO NOTHING RETURNING`` statement and only rows which
+        already existed are selected after, mapper events do not fire for
+        these inserts. Otherwise existing rows are selected in one query and
+        the rest are inserted. On PostgreSQL each is inserted in a savepoint
+        so a row created concurrently is fetched instead. Other databases,
+        such as SQLite without its transaction handling reconfigured, may
+        not support savepoints: the rows are flushed together and if one was
+        created concurrently the whole session is rolled back, discarding
+        any other pending changes, before they are fetched.
+
+        :param rows: List of dicts of column values
+        :type rows: list
+
+        :returns: list -- (Bool, instance) tuples
+        """
+
+        if not rows:
+            return []
+
+        keys = sorted(rows[0])
+        columns = [getattr(kls, key) for key in keys]
+
+        def key_of(obj):
+            if isinstance(obj, dict):
+                return tuple(obj[key] for key in keys)
+            return tuple(getattr(obj, key) for key in keys)
+
+        # Unique rows, keeping the first occurrence
+        unique = OrderedDict()
+        for row in rows:
+            unique.setdefault(key_of(row), row)
+
+        if db.session.connection().dialect.name == 'postgresql' and \
+                kls._unique_on(keys):
+            created = kls._insert_do_nothing(unique.values())
+            missing = [k for k in unique if k not in created]
+            existing = {}
+            if missing:
+                existing = dict(
+                    (key_of(obj), obj) for obj in db.session.query(kls)
+                    .filter(tuple_(*columns).in_(missing)))
+        else:
+            existing = dict(
+                (key_of(obj), obj) for obj in db.session.query(kls).filter(
+                    or_(*[and_(*[c == v for c, v in zip(columns, k)])
+                          for k in unique])))
+            created = kls._insert_each(
+                [row for k, row in unique.items() if k not in existing])
+            for k, obj in list(created.items()):
+                if obj is None:
+                    del created[k]
+                    existing[k] = db.session.query(kls).filter_by(
+                        **unique[k]).one()
+
+        results = []
+        for row in rows:
+            k = key_of(row)
+            if k in created:
+                # Duplicates within rows get the instance created by the first
+                results.append((False, created.pop(k)))
+                existing[k] = results[-1][1]
+            else:
+                results.append((True, existing[k]))
+
+        return results
+
+    @classmethod
+    def _unique_on(kls, keys):
+        """
+        Returns True if a unique constraint or index is on exactly the given
+        columns, only then does a conflicting insert mean the row exists
+        """
+
+        table = kls.__table__
+        keys = set(keys)
+
+        unique = [
+            c.columns for c in table.constraints
+            if isinstance(c, (PrimaryKeyConstraint, UniqueConstraint))]
+        unique.extend(i.columns for i in table.indexes if i.unique)
+
+        return any(set(c.key for c in columns) == keys for columns in unique)
+
+    @classmethod
+    def _insert_do_nothing(kls, rows):
+        """
+        Insert rows in one statement skipping those which already exist,
+        returns the created instances keyed by their lookup values
+        """
+
+        table = kls.__table__
+        keys = sorted(rows[0])
+
+        statement = InsertDoNothing(table).values(
+            [column_defaults(table, row) for row in rows]).returning(*table.c)
+
+        return dict(
+            (tuple(getattr(obj, key) for key in keys), obj)
+            for obj in db.session.query(kls).from_statement(statement))
+
+    @classmethod
+    def _insert_each(kls, rows):
+        """
+        Insert rows one by one in savepoints, returns the created instances
+        keyed by their lookup values, None for rows created concurrently
+        """
+
+        if db.session.connection().dialect.name != 'postgresql':
+            return kls._insert_all(rows)
+
+        created = OrderedDict()
+
+        for row in rows:
+            key = tuple(row[k] for k in sorted(row))
+            instance = kls(**row)
+            try:
+                with db.session.begin_nested():
+                    db.session.add(instance)
+            except IntegrityError:
+                instance = None
+            created[key] = instance
+
+        return created
+
+    @classmethod
+    def _insert_all(kls, rows):
+        """
+        Insert rows in one flush without savepoints, returns the created
+        instances keyed by their lookup values. If a row was created
+        concurrently the session is rolled back and every value is None,
+        unless a row still does not exist and the error was another one.
+        """
+
+        created = OrderedDict(
+            (tuple(row[k] for k in sorted(row)), kls(**row)) for row in rows)
+
+        db.session.add_all(created.values())
+        try:
+            db.session.flush()
+        except IntegrityError:
+            db.session.rollback()
+            for row in rows:
+                if db.session.query(kls).filter_by(**row).first() is None:
+                    raise
+            created = OrderedDict((key, None) for key in created)
+
+        return created
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: soon.db.pool
+   :synopsis: Connection pool configuration, fork safety and metrics for the
+              application's database engine
+"""
+
+import os
+import threading
+import time
+
+from functools import partial
+
+from flask.ext.sqlalchemy import _EngineConnector, SQLAlchemy
+from soon.db.replicas import RoutingSession
+from sqlalchemy import event, exc, orm
+from sqlalchemy.pool import QueuePool, StaticPool
+
+
+#: create_engine options sizing a pool, not accepted by SQLite's pools
+POOL_OPTIONS = ('pool_size', 'max_overflow', 'pool_timeout', 'pool_recycle')
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    Queue pool counting checkouts and how long they waited for a connection,
+    a checkout only waits once ``pool_size + max_overflow`` connections are
+    in use. Counts start again when the pool is recreated, e.g. after a
+    fork.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(InstrumentedQueuePool, self).__init__(*args, **kwargs)
+
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+
+    def _do_get(self):
+        start = time.time()
+        timed_out = False
+
+        try:
+            return super(InstrumentedQueuePool, self)._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            waited = time.time() - start
+            with self._stats_lock:
+                self.checkouts += 1
+                self.timeouts += timed_out
+                self.wait_time += waited
+                self.max_wait = max(self.max_wait, waited)
+
+
+def _record_pid(dbapi_connection, connection_record):
+    connection_record.info['pid'] = os.getpid()
+
+
+def _check_pid(dbapi_connection, connection_record, connection_proxy):
+    # A connection inherited across a fork is dropped rather than closed,
+    # closing it would end the parent's session on the server
+    if connection_record.info.get('pid') != os.getpid():
+        connection_record.connection = connection_proxy.connection = None
+        raise exc.DisconnectionError(
+            'Connection record belongs to pid {0}, attempting to check out '
+            'in pid {1}'.format(connection_record.info.get('pid'), os.getpid()))
+
+
+event.listen(InstrumentedQueuePool, 'connect', _record_pid)
+event.listen(InstrumentedQueuePool, 'checkout', _check_pid)
+
+
+def ping_connection(dbapi_connection, connection_record, connection_proxy):
+    """
+    SQLAlchemy pool checkout listener, tests a connection before it is used
+    so one closed by the server is replaced rather than failing the request.
+
+    Args:
+        dbapi_connection (object): The DBAPI connection
+        connection_record (sqlalchemy.pool._ConnectionRecord): Pool record
+        connection_proxy (sqlalchemy.pool._ConnectionFairy): Checked out proxy
+    """
+
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute('SELECT 1')
+    except Exception:
+        # The pool reconnects and retries the checkout
+        raise exc.DisconnectionError()
+    finally:
+        try:
+            cursor.close()
+        except Exception:
+            pass
+
+
+class ReplicaConnector(_EngineConnector):
+    """
+    Engine connector of a read replica, bound to an index of
+    ``SQLALCHEMY_REPLICA_URIS`` rather than a ``SQLALCHEMY_BINDS`` key
+    """
+
+    def get_uri(self):
+        return self._app.config['SQLALCHEMY_REPLICA_URIS'][self._bind[1]]
+
+
+class PooledSQLAlchemy(SQLAlchemy):
+    """
+    Flask-SQLAlchemy configuring the engine's pool from the
+    ``SQLALCHEMY_POOL_*`` settings. Server databases get an
+    :py:class:`InstrumentedQueuePool`, pinged on checkout when
+    ``SQLALCHEMY_POOL_PRE_PING`` is set. In memory SQLite shares one
+    connection between threads, each new connection would be a new empty
+    database, and SQLite files are opened per checkout.
+
+    Sessions are :py:class:`soon.db.replicas.RoutingSession` instances and
+    the engines of read replicas are configured as the primary's.
+    """
+
+    def create_scoped_session(self, options=None):
+        options = dict(options or {})
+        scopefunc = options.pop('scopefunc', None)
+
+        return orm.scoped_session(
+            partial(RoutingSession, self, **options),
+            scopefunc=scopefunc)
+
+    def make_connector(self, app, bind=None):
+        if isinstance(bind, tuple):
+            return ReplicaConnector(self, app, bind)
+
+        return super(PooledSQLAlchemy, self).make_connector(app, bind)
+
+    def apply_driver_hacks(self, app, info, options):
+        if info.drivername.startswith('sqlite'):
+            for option in POOL_OPTIONS:
+                options.pop(option, None)
+            if info.database in (None, '', ':memory:'):
+                options['poolclass'] = StaticPool
+                options.setdefault('connect_args', {})[
+                    'check_same_thread'] = False
+        else:
+            options.setdefault('poolclass', InstrumentedQueuePool)
+
+        super(PooledSQLAlchemy, self).apply_driver_hacks(app, info, options)
+
+    def get_engine(self, app, bind=None):
+        engine = super(PooledSQLAlchemy, self).get_engine(app, bind)
+
+        if app.config['SQLALCHEMY_POOL_PRE_PING'] and \
+                not event.contains(engine, 'checkout', ping_connection):
+            event.listen(engine, 'checkout', ping_connection)
+
+        return engine
+
+    def dispose(self, app):
+        """
+        Close every pooled connection of the application's engines, including
+        read replicas, connections are opened again as needed. Call before a
+        server forks its workers and again in each worker.
+
+        :param app: Flask application instance
+        :type app: flask.app.Flask
+        """
+
+        self.get_engine(app).dispose()
+
+        for index in range(len(app.config.get('SQLALCHEMY_REPLICA_URIS', []))):
+            self.get_engine(app, ('replica', index)).dispose()
+
+
+def pool_status(engine):
+    """
+    Returns metrics of an engine's connection pool in this process. Size
+    workers so that ``processes * (size + max_overflow)`` stays below
+    PostgreSQL's ``max_connections``.
+
+    :param engine: The engine
+    :type engine: sqlalchemy.engine.Engine
+
+    :returns: dict
+    """
+
+    pool = engine.pool
+    status = {'pool': type(pool).__name__}
+
+    if isinstance(pool, QueuePool):
+        status.update({
+            'size': pool.size(),
+            'max_overflow': pool._max_overflow,
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow(),
+        })
+
+    if isinstance(pool, InstrumentedQueuePool):
+        with pool._stats_lock:
+            status.update({
+                'checkouts': pool.checkouts,
+                'timeouts': pool.timeouts,
+                'wait_time': round(pool.wait_time, 6),
+                'max_wait': round(pool.max_wait, 6),
+            })
+
+    return status
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: soon.db.replicas
+   :synopsis: Routes queries of read only views to read replica databases,
+              writes and everything else use the primary
+"""
+
+import itertools
+import threading
+import time
+
+from functools import wraps
+
+from flask import current_app, g, has_request_context, request
+from flask import session as flask_session
+from flask.ext.sqlalchemy import _SignallingSession
+from soon.db.events import on_commit
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+# Session info key of the chosen replica
+SESSION_REPLICA_KEY = 'read_replica'
+
+# Flask session key holding the time until which reads use the primary
+STICKY_KEY = 'primary_until'
+
+
+class ReadReplicas(object):
+    """
+    Sends the queries of views decorated with :py:meth:`routed` to the
+    databases in ``SQLALCHEMY_REPLICA_URIS``, each database session picks
+    the next replica in turn and keeps it so a request reads one consistent
+    snapshot. Flushes always go to the primary.
+
+    A client which commits a write reads from the primary for the next
+    ``REPLICA_STICKY_SECONDS``, through a key in its Flask session, so
+    admins see their own changes however far the replicas lag.
+    """
+
+    def __init__(self, app=None):
+        self._cycles = {}
+        self._lock = threading.Lock()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Register replica routing with the application
+
+        :param app: Flask application instance
+        :type app: flask.app.Flask
+        """
+
+        app.extensions['read_replicas'] = self
+
+    def next_bind(self, app):
+        """
+        Returns the key of the next replica engine in round robin order, or
+        None when no replicas are configured
+
+        :param app: Flask application instance
+        :type app: flask.app.Flask
+
+        :returns: tuple or None
+        """
+
+        count = len(app.config['SQLALCHEMY_REPLICA_URIS'])
+        if not count:
+            return None
+
+        with self._lock:
+            cycle = self._cycles.get(app)
+            if cycle is None:
+                cycle = self._cycles[app] = itertools.cycle(range(count))
+            index = next(cycle)
+
+        return ('replica', index)
+
+    def sticky(self):
+        """
+        Returns True if this client recently wrote and must read the primary
+        """
+
+        return flask_session.get(STICKY_KEY, 0) > time.time()
+
+    def lagging(self, since):
+        """
+        Returns True if the current request reads from a replica which may
+        not yet have the writes committed at ``since``, replicas are taken to
+        catch up within ``REPLICA_STICKY_SECONDS``
+
+        :param since: Time stamp of the writes, None if unknown
+        :type since: float
+
+        :returns: bool
+        """
+
+        return bool(
+            getattr(g, 'read_replica', False) and
+            current_app.config['SQLALCHEMY_REPLICA_URIS'] and
+            since is not None and
+            time.time() - since < current_app.config['REPLICA_STICKY_SECONDS'])
+
+    def routed(self, view):
+        """
+        View decorator sending the ``GET`` and ``HEAD`` queries of a view to
+        a replica. Class based views opt in by adding this to the end of
+        their ``decorators`` list so it also covers the others:
+
+            class HomeView(ModelListView):
+                decorators = [response_cache.cached, read_replicas.routed]
+
+        :param view: View function
+        :type view: function
+
+        :returns: function -- Decorated view
+        """
+
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method in ('GET', 'HEAD') and not self.sticky():
+                g.read_replica = True
+
+            return view(*args, **kwargs)
+
+        return wrapper
+
+
+class RoutingSession(_SignallingSession):
+    """
+    Flask-SQLAlchemy session reading from a replica when the current request
+    is routed by :py:meth:`ReadReplicas.routed`
+    """
+
+    def __init__(self, db, *args, **kwargs):
+        self.db = db
+        super(RoutingSession, self).__init__(db, *args, **kwargs)
+
+    def get_bind(self, mapper=None, clause=None):
+        if not self._flushing and has_request_context() and \
+                getattr(g, 'read_replica', False):
+            bind = self.info.get(SESSION_REPLICA_KEY)
+            if bind is None:
+                replicas = self.app.extensions.get('read_replicas')
+                bind = replicas and replicas.next_bind(self.app)
+                self.info[SESSION_REPLICA_KEY] = bind
+            if bind:
+                return self.db.get_engine(self.app, bind=bind)
+
+        return super(RoutingSession, self).get_bind(mapper, clause)
+
+
+def _stick_to_primary():
+    if has_request_context():
+        seconds = current_app.config['REPLICA_STICKY_SECONDS']
+        if seconds and current_app.config['SQLALCHEMY_REPLICA_URIS']:
+            flask_session[STICKY_KEY] = time.time() + seconds
+
+
+@event.listens_for(Session, 'after_flush')
+def _session_after_flush(session, flush_context):
+    if has_request_context():
+        on_commit(session, 'read_replicas', _stick_to_primary)
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: soon.db.stats
+   :synopsis: Counts and times the SQL statements of each request, logging
+              a summary per request and statements slower than a threshold
+"""
+
+import logging
+import re
+import threading
+import time
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# Bind parameter placeholders of every DBAPI param style
+PLACEHOLDER_RE = re.compile(r'%\(\w+\)s|%s|:\w+|\?')
+LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+LIST_RE = re.compile(r'\?(?:\s*,\s*\?)+')
+SPACE_RE = re.compile(r'\s+')
+
+
+def normalize_sql(statement):
+    """
+    Reduce a statement to its shape so repeats of a query group together,
+    literals and parameters become ``?`` and lists of them a single ``?``.
+
+    :param statement: SQL statement
+    :type statement: str
+
+    :returns: str
+    """
+
+    statement = LITERAL_RE.sub('?', statement)
+    statement = PLACEHOLDER_RE.sub('?', statement)
+    statement = LIST_RE.sub('?', statement)
+
+    return SPACE_RE.sub(' ', statement).strip()
+
+
+class RequestQueries(object):
+    """
+    Statements executed during one request, only the ``keep`` slowest are
+    kept with their SQL.
+    """
+
+    def __init__(self, keep):
+        self.keep = keep
+        self.count = 0
+        self.time = 0.0
+        self.slowest = []
+
+    def add(self, statement, elapsed):
+        self.count += 1
+        self.time += elapsed
+
+        if len(self.slowest) < self.keep or elapsed > self.slowest[-1][0]:
+            self.slowest.append((elapsed, statement))
+            self.slowest.sort(key=lambda s: s[0], reverse=True)
+            del self.slowest[self.keep:]
+
+
+class QueryStats(object):
+    """
+    Times every statement executed through SQLAlchemy engines while handling
+    a request. Each request logs its endpoint, statement count and total
+    database time at debug level, or as a warning when the total reaches
+    ``QUERY_SLOW_THRESHOLD`` seconds, in DEBUG these are also sent as
+    ``X-Query-Count`` and ``X-Query-Time`` response headers. Statements
+    slower than the threshold are logged as warnings with their normalized
+    SQL. Totals per endpoint are kept for the process, see
+    :py:meth:`endpoints`.
+    """
+
+    def __init__(self, app=None):
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Register the request hooks with the application
+
+        :param app: Flask application instance
+        :type app: flask.app.Flask
+        """
+
+        if app.config['QUERY_STATS_HEADERS'] is None:
+            app.config['QUERY_STATS_HEADERS'] = app.debug
+
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+
+        app.extensions['query_stats'] = self
+
+    def before_request(self):
+        if current_app.config['QUERY_STATS_ENABLED']:
+            g.query_stats = RequestQueries(
+                current_app.config['QUERY_STATS_SLOWEST'])
+
+    def record(self, statement, elapsed):
+        """
+        Record a statement executed during the current request
+
+        :param statement: SQL statement
+        :type statement: str
+
+        :param elapsed: Seconds the statement took
+        :type elapsed: float
+        """
+
+        queries = getattr(g, 'query_stats', None)
+        if queries is None:
+            return
+
+        queries.add(statement, elapsed)
+
+        threshold = current_app.config['QUERY_SLOW_THRESHOLD']
+        if threshold is not None and elapsed >= threshold:
+            current_app.logger.warning(
+                'Slow query: endpoint={0} time_ms={1:.1f} sql="{2}"'.format(
+                    request.endpoint,
+                    elapsed * 1000,
+                    normalize_sql(statement)))
+
+    def after_request(self, response):
+        queries = getattr(g, 'query_stats', None)
+        if queries is None:
+            return response
+
+        endpoint = request.endpoint or 'none'
+        slowest, statement = queries.slowest[0] if queries.slowest \
+            else (0.0, None)
+
+        with self._lock:
+            totals = self._endpoints.setdefault(
+                endpoint,
+                [0, 0, 0.0, 0.0, None])
+            totals[0] += 1
+            totals[1] += queries.count
+            totals[2] += queries.time
+            if statement is not None and slowest >= totals[3]:
+                totals[3:] = [slowest, statement]
+
+        if current_app.config['QUERY_STATS_HEADERS']:
+            response.headers['X-Query-Count'] = str(queries.count)
+            response.headers['X-Query-Time'] = '{0:.1f}'.format(
+                queries.time * 1000)
+
+        # Summaries are debug noise unless the request's queries together
+        # took as long as the slow query threshold
+        threshold = current_app.config['QUERY_SLOW_THRESHOLD']
+        slow = threshold is not None and queries.time >= threshold
+        current_app.logger.log(
+            logging.WARNING if slow else logging.DEBUG,
+            'Request queries: endpoint={0} method={1} status={2} queries={3} '
+            'db_time_ms={4:.1f} slowest_ms={5:.1f}'.format(
+                endpoint,
+                request.method,
+                response.status_code,
+                queries.count,
+                queries.time * 1000,
+                slowest * 1000))
+
+        return response
+
+    def endpoints(self):
+        """
+        Returns totals per endpoint since the process started, with the
+        slowest statement seen
+
+        :returns: dict -- Endpoint to a dict of totals
+        """
+
+        with self._lock:
+            return dict(
+                (endpoint, {
+                    'requests': requests,
+                    'queries': count,
+                    'db_time_ms': round(total * 1000, 1),
+                    'queries_per_request': round(count / float(requests), 2),
+                    'slowest_ms': round(slowest * 1000, 1),
+                    'slowest_sql': statement and normalize_sql(statement),
+                })
+                for endpoint, (requests, count, total, slowest, statement)
+                in self._endpoints.items())
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    conn.info.setdefault('query_stats_start', []).append(time.time())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    elapsed = time.time() - conn.info['query_stats_start'].pop()
+
+    if has_request_context():
+        stats = current_app.extensions.get('query_stats')
+        if stats is not None:
+            stats.record(statement, elapsed)
+
+
+@event.listens_for(Engine, 'dbapi_error')
+def _dbapi_error(conn, cursor, statement, parameters, context, exception):
+    conn.info['query_stats_start'].pop()
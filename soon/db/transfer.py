@@ -0,0 +1,397 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: soon.db.transfer
+   :synopsis: Streams model rows in and out as JSON Lines or CSV, in batches
+              and in constant memory
+"""
+
+import csv
+import datetime
+import io
+import json
+import multiprocessing
+
+from collections import OrderedDict
+from itertools import islice
+
+from flask import current_app
+from flask.ext.security.utils import encrypt_password
+from soon.db.mixins import column_defaults
+from soon.ext import db
+from sqlalchemy import text
+
+
+#: Supported file formats
+FORMATS = ['jsonl', 'csv']
+
+DATETIME_FORMATS = ['%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S']
+
+
+def guess_format(path):
+    """
+    Returns the format of a file from its extension, JSON Lines by default
+
+    :param path: Path of the file
+    :type path: str
+
+    :returns: str
+    """
+
+    return 'csv' if path.lower().endswith('.csv') else 'jsonl'
+
+
+def batches(iterable, size):
+    """
+    Split an iterable into lists of at most ``size`` items
+
+    :param iterable: The items
+    :type iterable: iterable
+
+    :param size: Items per batch
+    :type size: int
+
+    :returns: generator -- Lists of items
+    """
+
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _python_type(column):
+    try:
+        return column.type.python_type
+    except NotImplementedError:
+        return None
+
+
+def dump_value(value):
+    """
+    Convert a column value to JSON / CSV friendly data
+    """
+
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+
+    return value
+
+
+def load_value(column, value):
+    """
+    Convert a value read from a file back to the column's type, CSV values
+    are all strings with empty strings for NULL.
+
+    :param column: The column the value is for
+    :type column: sqlalchemy.schema.Column
+
+    :param value: The value as read
+    :type value: object
+
+    :returns: object
+    """
+
+    if value is None or (value == '' and column.nullable):
+        return None
+
+    python_type = _python_type(column)
+    if python_type is None or isinstance(value, python_type):
+        return value
+
+    if python_type is datetime.datetime:
+        for fmt in DATETIME_FORMATS:
+            try:
+                return datetime.datetime.strptime(value, fmt)
+            except ValueError:
+                continue
+        raise ValueError('Invalid date time for {0}: {1!r}'.format(
+            column.key,
+            value))
+
+    if python_type is bool:
+        return value.lower() in ('1', 'true', 't', 'yes')
+
+    return python_type(value)
+
+
+def export_rows(model, out, fmt, batch_size):
+    """
+    Write every row of a model's table to a file ordered by primary key.
+    Rows are read through a server side cursor where the driver supports
+    one, so memory use does not grow with the table.
+
+    :param model: The model to export
+    :type model: flask_sqlalchemy.Model
+
+    :param out: File like object opened for writing bytes
+    :type out: file
+
+    :param fmt: One of :py:data:`FORMATS`
+    :type fmt: str
+
+    :param batch_size: Rows fetched from the cursor at a time
+    :type batch_size: int
+
+    :returns: int -- Number of rows written
+    """
+
+    table = model.__table__
+    keys = [c.key for c in table.c]
+
+    if fmt == 'csv':
+        writer = csv.writer(out)
+        writer.writerow(keys)
+
+    count = 0
+    connection = db.engine.connect().execution_options(stream_results=True)
+
+    try:
+        result = connection.execute(
+            table.select().order_by(*table.primary_key.columns))
+
+        while True:
+            rows = result.fetchmany(batch_size)
+            if not rows:
+                break
+
+            for row in rows:
+                values = [dump_value(row[key]) for key in keys]
+                if fmt == 'csv':
+                    writer.writerow([
+                        u'' if v is None else unicode(v).encode('utf-8')
+                        for v in values])
+                else:
+                    out.write(json.dumps(dict(zip(keys, values))) + '\n')
+
+            count += len(rows)
+    finally:
+        connection.close()
+
+    return count
+
+
+def read_rows(model, lines, fmt):
+    """
+    Parse rows from a file, values are converted to their column types and
+    unknown keys are dropped.
+
+    :param model: The model the rows are for
+    :type model: flask_sqlalchemy.Model
+
+    :param lines: File like object opened for reading bytes
+    :type lines: file
+
+    :param fmt: One of :py:data:`FORMATS`
+    :type fmt: str
+
+    :returns: generator -- dicts of column values
+    """
+
+    columns = dict((c.key, c) for c in model.__table__.c)
+
+    if fmt == 'csv':
+        rows = (
+            dict((k, v.decode('utf-8')) for k, v in row.items())
+            for row in csv.DictReader(lines))
+    else:
+        rows = (json.loads(line) for line in lines if line.strip())
+
+    for row in rows:
+        yield dict(
+            (key, load_value(columns[key], value))
+            for key, value in row.items() if key in columns)
+
+
+def hash_password(password):
+    """
+    Hash a plain text password, passwords which are already hashes, such as
+    those exported from another environment, are returned unchanged.
+    """
+
+    context = current_app.extensions['security'].pwd_context
+    if password is None or context.identify(password) != 'plaintext':
+        return password
+
+    return encrypt_password(password)
+
+
+def _push_app_context(app):
+    app.app_context().push()
+
+
+def copy_field(value):
+    """
+    Encode a value as a field of ``COPY ... WITH CSV`` input. NULL is an
+    unquoted empty field, every other value is quoted so an empty string
+    stays an empty string, quoted values are still parsed by column type.
+
+    :param value: Column value
+    :type value: object
+
+    :returns: str
+    """
+
+    if value is None:
+        return ''
+
+    if isinstance(value, unicode):
+        value = value.encode('utf-8')
+    else:
+        value = str(value)
+
+    return '"{0}"'.format(value.replace('"', '""'))
+
+
+def group_by_keys(rows):
+    """
+    Group rows by the columns they have values for, a single insert or
+    ``COPY`` needs the same columns in every row and a missing column must
+    keep its server default rather than become NULL.
+
+    :param rows: dicts of column values
+    :type rows: list
+
+    :returns: list -- Lists of rows with the same keys, in first seen order
+    """
+
+    groups = OrderedDict()
+    for row in rows:
+        groups.setdefault(tuple(sorted(row)), []).append(row)
+
+    return groups.values()
+
+
+def copy_rows(connection, table, rows):
+    """
+    Insert rows with PostgreSQL's ``COPY ... FROM STDIN``, Python side
+    column defaults are applied first as the statement bypasses them.
+    Every row must have the same keys, see :py:func:`group_by_keys`.
+    """
+
+    rows = [column_defaults(table, row) for row in rows]
+    keys = sorted(rows[0])
+
+    data = io.BytesIO()
+    for row in rows:
+        data.write(','.join(copy_field(row.get(key)) for key in keys))
+        data.write('\n')
+    data.seek(0)
+
+    preparer = connection.dialect.identifier_preparer
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(
+            'COPY {0} ({1}) FROM STDIN WITH CSV'.format(
+                preparer.format_table(table),
+                ', '.join(preparer.quote(key) for key in keys)),
+            data)
+    finally:
+        cursor.close()
+
+
+def reset_sequence(connection, table):
+    """
+    Move a PostgreSQL serial sequence past the highest imported id
+    """
+
+    preparer = connection.dialect.identifier_preparer
+    name = preparer.format_table(table)
+
+    connection.execute(text(
+        'SELECT setval(pg_get_serial_sequence(:table, \'id\'), max(id)) '
+        'FROM {0}'.format(name)), table=name)
+
+
+def import_rows(model, lines, fmt, batch_size, processes=None):
+    """
+    Insert rows read from a file, committing every ``batch_size`` rows.
+    PostgreSQL loads each batch with ``COPY``, other databases with an
+    ``executemany`` insert. A ``password`` column is hashed on a pool of
+    ``processes`` processes.
+
+    Rows are written without the ORM so mapper events do not fire, the
+    response and user caches are cleared once the import is done. A failing
+    batch is rolled back, the batches before it stay committed. Rows may
+    leave out columns with defaults, other than defaults needing a request
+    such as ``Job.user_id``.
+
+    :param model: The model to import
+    :type model: flask_sqlalchemy.Model
+
+    :param lines: File like object opened for reading bytes
+    :type lines: file
+
+    :param fmt: One of :py:data:`FORMATS`
+    :type fmt: str
+
+    :param batch_size: Rows inserted per statement and transaction
+    :type batch_size: int
+
+    :param processes: Hashing processes, the number of CPUs when None
+    :type processes: int
+
+    :raises: ValueError -- A row has an invalid value, or no value for a
+             column whose default needs a request
+
+    :returns: int -- Number of rows inserted
+    """
+
+    table = model.__table__
+    pool = None
+    count = 0
+    has_ids = False
+
+    if 'password' in table.c:
+        # Forked workers must not share the parent's connections
+        db.engine.dispose()
+        pool = multiprocessing.Pool(
+            processes,
+            initializer=_push_app_context,
+            initargs=(current_app._get_current_object(), ))
+
+    try:
+        for batch in batches(read_rows(model, lines, fmt), batch_size):
+            if pool is not None:
+                passwords = pool.map(
+                    hash_password,
+                    [row.get('password') for row in batch],
+                    chunksize=max(1, len(batch) // (pool._processes * 4)))
+                for row, password in zip(batch, passwords):
+                    if password is not None:
+                        row['password'] = password
+
+            has_ids = has_ids or any(row.get('id') for row in batch)
+
+            try:
+                connection = db.session.connection()
+                rows = [column_defaults(table, row) for row in batch]
+                for group in group_by_keys(rows):
+                    if connection.dialect.name == 'postgresql':
+                        copy_rows(connection, table, group)
+                    else:
+                        connection.execute(table.insert(), group)
+                db.session.commit()
+            except:
+                db.session.rollback()
+                raise
+
+            count += len(batch)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    connection = db.session.connection()
+    if has_ids and connection.dialect.name == 'postgresql':
+        reset_sequence(connection, table)
+        db.session.commit()
+
+    for name in ('response_cache', 'session_users'):
+        extension = current_app.extensions.get(name)
+        if extension is not None:
+            extension.invalidate()
+
+    return count
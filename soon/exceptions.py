@@ -12,3 +12,11 @@ class ImproperlyConfigured(Exception):
     """
 
     pass
+
+
+class HashPoolBusy(Exception):
+    """
+    Raised when no password hashing capacity is available in time
+    """
+
+    pass
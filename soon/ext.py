@@ -8,28 +8,63 @@
 
 # Databse
 
-from flask.ext.sqlalchemy import SQLAlchemy
-db = SQLAlchemy()
+from soon.db.pool import PooledSQLAlchemy
+db = PooledSQLAlchemy()
 
-# Migrations
+# Read Replicas
 
-from flask.ext.migrate import Migrate
-migrate = Migrate()
+from soon.db.replicas import ReadReplicas
+read_replicas = ReadReplicas()
+
+# Query Statistics
+
+from soon.db.stats import QueryStats
+query_stats = QueryStats()
 
 # Security
 
 from flask.ext.security import Security
 security = Security()
 
-# Static Collection
-
-from flask.ext.collect import Collect
-collect = Collect()
-
-# Gravatar
-from flask.ext.gravatar import Gravatar
-gravatar = Gravatar(size=100)
+# Flask-Admin, Flask-Collect and Gravatar are only initialised by the full
+# profile, see soon.loader.register_extenstions
 
 # Velox
 from flask.ext.velox import Velox
 velox = Velox()
+
+# Response Cache
+from soon.cache import ResponseCache
+response_cache = ResponseCache()
+
+# Template Snapshots
+from soon.snapshots import Snapshots
+snapshots = Snapshots()
+
+# Fingerprinted Static Assets
+from soon.assets.manifest import Assets
+assets = Assets()
+
+# Responsive Images
+from soon.assets.images import ResponsiveImages
+responsive_images = ResponsiveImages()
+
+# Compression
+from soon.compression import Compression
+compression = Compression()
+
+# Deferred File Cleanup
+from soon.cleanup import FileCleanup
+file_cleanup = FileCleanup()
+
+# Password Hashing
+from soon.auth.passwords import HashPool
+hash_pool = HashPool()
+
+# Login Throttling
+from soon.throttle import LoginThrottle
+login_throttle = LoginThrottle()
+
+# Session User Loading
+from soon.auth.users import SessionUsers
+session_users = SessionUsers()
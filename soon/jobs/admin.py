@@ -7,7 +7,6 @@
 
 from flask.ext.login import current_user
 from flask.ext.admin import BaseView, expose_plugview
-from flask.ext.velox.admin.views.sqla.read import AdminModelTableView
 from flask.ext.velox.admin.views.sqla.forms import (
     AdminCreateModelView,
     AdminUpdateModelView)
@@ -18,6 +17,7 @@ from flask.ext.velox.formatters import datetime_formatter
 from soon.ext import db
 from soon.jobs.forms import JobForm, JobUpdateForm
 from soon.jobs.models import Job
+from soon.views.admin.tables import KeysetTableView
 
 
 class JobAdminView(BaseView):
@@ -28,9 +28,10 @@ class JobAdminView(BaseView):
         return False
 
     @expose_plugview('/')
-    class index(AdminModelTableView):
+    class index(KeysetTableView):
         model = Job
         columns = ['title', 'created', 'updated']
+        sortable = ['created', 'title']
         formatters = {
             'created': datetime_formatter,
             'updated': datetime_formatter
@@ -60,3 +61,11 @@ class JobAdminView(BaseView):
     class delete_multi(AdminMultiDeleteObjectView):
         model = Job
         session = db.session
+
+
+admin = [
+    JobAdminView(
+        name='Jobs',
+        url='jobs',
+        endpoint='admin.jobs')
+]
@@ -5,15 +5,49 @@
    :synopsis: Functions fired on SQLAlchemy ORM Events
 """
 
-import os
-
 from flask import current_app
+from soon.ext import db, file_cleanup
+from soon.jobs.storage import spec_store
+from sqlalchemy import or_
+from sqlalchemy.orm import object_session
+from sqlalchemy.orm.attributes import get_history
+
+
+def release_specs(blobs):
+    """
+    Delete job spec files no job references anymore. Specs are content
+    addressed so several jobs may share one file, the references of the
+    whole batch are found in a single query. Called by the file cleanup
+    worker after the releasing transaction has committed. Files modified
+    within ``FILE_CLEANUP_GRACE`` seconds may be about to be referenced by
+    an upload not yet committed, they are left for ``manage.py
+    sweep_files``.
+
+    Args:
+        blobs (list): File names relative to ``MEDIA_ROOT``
+    """
+
+    from soon.jobs.models import Job
+
+    referenced = set(
+        spec_store.blob(spec) for spec, in db.session.query(Job.spec).filter(
+            or_(*[Job.spec.like(spec_store.pattern(blob), escape='\\')
+                  for blob in blobs])))
+
+    grace = current_app.config['FILE_CLEANUP_GRACE']
+
+    for blob in blobs:
+        if blob not in referenced:
+            spec_store.delete(blob, grace)
+
+
+file_cleanup.register(spec_store, release_specs)
 
 
 def job_after_delete(mapper, connection, target):
     """
-    Called after delete of a `Job` object. Deletes attached file
-    with the object from the file system.
+    Called after delete of a `Job` object. Schedules the attached file for
+    deletion once the transaction commits, unless other jobs share it.
 
     Args:
         mapper (sqlalchemy.orm.mapper.Mapper): Mapper target of this event
@@ -21,9 +55,26 @@ def job_after_delete(mapper, connection, target):
         target (soon.jobs.models.Job): The deleted instance
     """
 
-    path = os.path.join(
-        current_app.config['MEDIA_ROOT'],
-        target.spec)
+    if target.spec:
+        file_cleanup.schedule(
+            object_session(target),
+            spec_store.blob(target.spec))
+
+
+def job_after_update(mapper, connection, target):
+    """
+    Called after update of a `Job` object. Schedules the file of a replaced
+    spec for deletion once the transaction commits, unless other jobs share
+    it.
+
+    Args:
+        mapper (sqlalchemy.orm.mapper.Mapper): Mapper target of this event
+        connection (sqlalchemy.engine.Connection): The db connection session
+        target (soon.jobs.models.Job): The updated instance
+    """
 
-    if os.path.exists(path):
-        os.remove(path)
+    for spec in get_history(target, 'spec').deleted:
+        if spec and spec != target.spec:
+            file_cleanup.schedule(
+                object_session(target),
+                spec_store.blob(spec))
@@ -6,12 +6,22 @@
 """
 
 from flask.ext.velox.fields import UploadFileField
+from soon.jobs.storage import spec_store
+from werkzeug.datastructures import FileStorage
 
 
 class UploadJobSpecField(UploadFileField):
     """
-    Sets the `upload_to` attribute so job files get uploadded to
-    `MEDIA_ABS_DIR`/jobs.
+    Saves job spec uploads to the content addressed `spec_store` under
+    `MEDIA_ROOT`/jobs, identical files are stored once. The replaced spec
+    is not deleted here, `soon.jobs.events` removes it once no job
+    references it.
     """
 
     upload_to = 'jobs'
+
+    def populate_obj(self, obj, name):
+        if self.data and isinstance(self.data, FileStorage):
+            setattr(obj, name, spec_store.save(
+                self.data.stream,
+                self.data.filename))
@@ -6,16 +6,30 @@
 """
 
 from flask.ext.login import current_user
+from soon.cache import invalidate_response_cache
 from soon.db.mixins import CreateUpdateMixin
 from soon.ext import db
 from soon.jobs.fields import UploadJobSpecField
-from soon.jobs.events import job_after_delete
+from soon.jobs.events import job_after_delete, job_after_update
 from sqlalchemy import event
 
 
 class Job(db.Model, CreateUpdateMixin):
 
     __tablename__ = 'jobs'
+    __table_args__ = (
+        # Keyset pagination of the admin table, also serves created alone
+        db.Index('ix_jobs_created_id', 'created', 'id'),
+        db.Index('ix_jobs_title_id', 'title', 'id'),
+        # Freshness of cached pages
+        db.Index('ix_jobs_updated', 'updated'),
+        # Cascaded deletes of users
+        db.Index('ix_jobs_user_id', 'user_id'),
+        # Media authorisation and reference counting by spec prefix
+        db.Index(
+            'ix_jobs_spec',
+            'spec',
+            postgresql_ops={'spec': 'varchar_pattern_ops'}))
 
     # Primary Key
     id = db.Column(db.Integer, primary_key=True)
@@ -38,12 +52,16 @@ class Job(db.Model, CreateUpdateMixin):
         nullable=False,
         info={
             'label': 'Blurb'})
-    spec = db.Column(
-        db.Unicode(512),
-        nullable=False,
-        info={
-            'label': 'Spec (PDF)',
-            'form_field_class': UploadJobSpecField})
+    # Active history so the replaced spec is known even when the job was
+    # expired, its file is deleted once no job references it
+    spec = db.column_property(
+        db.Column(
+            db.Unicode(512),
+            nullable=False,
+            info={
+                'label': 'Spec (PDF)',
+                'form_field_class': UploadJobSpecField}),
+        active_history=True)
 
     def __repr__(self):
         return '<Job: id={0.id!r} title={0.title!r}>'.format(self)
@@ -51,5 +69,24 @@ class Job(db.Model, CreateUpdateMixin):
     def __str__(self):
         return self.title
 
+    @classmethod
+    def freshness(kls):
+        """
+        Returns the most recent ``updated`` time stamp and the number of jobs
+        in a single query, used to validate cached pages which list jobs.
+
+        :returns: tuple -- datetime or None, int
+        """
+
+        return db.session.query(
+            db.func.max(kls.updated),
+            db.func.count(kls.id)).one()
+
 
 event.listen(Job, 'after_delete', job_after_delete)
+event.listen(Job, 'after_update', job_after_update)
+
+# Jobs are rendered on the home page, clear cached responses on write
+event.listen(Job, 'after_insert', invalidate_response_cache)
+event.listen(Job, 'after_update', invalidate_response_cache)
+event.listen(Job, 'after_delete', invalidate_response_cache)
@@ -6,7 +6,10 @@
 """
 
 from flask.blueprints import Blueprint
-from soon.jobs.admin import JobAdminView
+from soon.ext import db
+from soon.jobs.models import Job
+from soon.jobs.storage import spec_store
+from soon.views.media import media_authoriser, media_resolver
 
 
 blueprint = Blueprint(
@@ -17,9 +20,16 @@ blueprint = Blueprint(
 
 routes = []
 
-admin = [
-    JobAdminView(
-        name='Jobs',
-        url='jobs',
-        endpoint='admin.jobs')
-]
+
+@media_authoriser('jobs')
+def job_spec(filename):
+    """
+    Only serve job specs which are attached to a job
+    """
+
+    return db.session.query(
+        Job.query.filter_by(spec=filename).exists()).scalar()
+
+
+# Spec URLs carry the uploaded file name, the content is in a shared blob
+media_resolver('jobs')(spec_store.blob)
@@ -0,0 +1,12 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: soon.jobs.storage
+   :synopsis: Storage for uploaded job specs
+"""
+
+from soon.storage import ContentStore
+
+
+# Job specs are stored by content so identical uploads share one file
+spec_store = ContentStore('jobs')
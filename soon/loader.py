@@ -6,18 +6,56 @@
                around auto loading blueprints, models and admin registration.
 """
 
+import json
 import os
+import pkgutil
 
 from flask import Flask
 from flask.ext.security import SQLAlchemyUserDatastore
 from soon.exceptions import ImproperlyConfigured
+from soon.startup import startup
+from soon.templating import TemplateBytecodeCache
 from soon.views.home import HomeView, peabody, residentadvisor
-from soon.ext import collect, db, gravatar, migrate, security, velox
-from werkzeug import SharedDataMiddleware
+from soon.views.media import media
+from soon.ext import (
+    assets,
+    compression,
+    db,
+    file_cleanup,
+    hash_pool,
+    login_throttle,
+    query_stats,
+    read_replicas,
+    response_cache,
+    responsive_images,
+    security,
+    session_users,
+    snapshots,
+    velox)
 
 
 admin = None
 
+# Supported values of the APP_PROFILE setting, public processes leave out
+# the admin and its extensions
+APP_PROFILES = ('full', 'public')
+
+# Modules a blueprint package may contain, routes is required
+BLUEPRINT_MODULES = ('models', 'routes', 'admin')
+
+# Supported values of the MEDIA_SERVE setting
+MEDIA_SERVE_MODES = ('app', 'x-accel-redirect', 'x-sendfile')
+
+# Database settings read from environment variables of the same name
+DATABASE_ENVIRON = (
+    ('SQLALCHEMY_POOL_SIZE', int),
+    ('SQLALCHEMY_MAX_OVERFLOW', int),
+    ('SQLALCHEMY_POOL_TIMEOUT', int),
+    ('SQLALCHEMY_POOL_RECYCLE', int),
+    ('SQLALCHEMY_POOL_PRE_PING', lambda v: v.lower() in ('1', 'true', 'yes')),
+    ('SQLALCHEMY_REPLICA_URIS', lambda v: [u for u in v.split(',') if u]),
+)
+
 
 def load_config(app, override=None):
     """
@@ -42,20 +80,136 @@ def load_config(app, override=None):
     if override:
         app.config.from_pyfile(override)
 
+    # Pool settings from the environment take precedence over files
+    for key, cast in DATABASE_ENVIRON:
+        if os.environ.get(key):
+            try:
+                app.config[key] = cast(os.environ[key])
+            except ValueError:
+                raise ImproperlyConfigured('{0} is not valid: {1!r}'.format(
+                    key,
+                    os.environ[key]))
+
+    # Compiled templates are read from disk rather than compiled per process,
+    # set before the Jinja environment is first used
+    if app.config.get('TEMPLATE_BYTECODE_DIR'):
+        app.jinja_options = dict(
+            app.jinja_options,
+            bytecode_cache=TemplateBytecodeCache(
+                app.config['TEMPLATE_BYTECODE_DIR']))
+
+
+def resolve_blueprints(blueprints):
+    """
+    Find which of ``BLUEPRINT_MODULES`` each blueprint package contains,
+    without importing them so errors raised by a module are not mistaken
+    for it being absent.
+
+    :param blueprints: Python module paths of the blueprints
+    :type blueprints: list
+
+    :raises: soon.exceptions.ImproperlyConfigured -- A blueprint has no
+             routes module
+
+    :returns: list -- Dicts of the blueprint name and the names of the
+              modules it contains
+    """
+
+    resolved = []
+
+    for blueprint in blueprints:
+        modules = [
+            part for part in BLUEPRINT_MODULES
+            if pkgutil.find_loader('{0}.{1}'.format(blueprint, part))]
+
+        if 'routes' not in modules:
+            raise ImproperlyConfigured(
+                '{0} has no routes module'.format(blueprint))
+
+        resolved.append({'name': blueprint, 'modules': modules})
+
+    return resolved
+
+
+def package_modules(package):
+    """
+    Returns which of ``BLUEPRINT_MODULES`` an imported blueprint package
+    contains, from a single listing of its directory
+
+    :param package: The blueprint package
+    :type package: module
+
+    :returns: list -- Module names
+    """
+
+    names = set(
+        os.path.splitext(filename)[0]
+        for filename in os.listdir(os.path.dirname(package.__file__)))
+
+    return [part for part in BLUEPRINT_MODULES if part in names]
+
+
+def write_blueprint_manifest(app):
+    """
+    Resolve the blueprints in ``BLUEPRINTS`` and write them to the
+    ``BLUEPRINT_MANIFEST`` file, loaded by :py:func:`create_app` from then
+    on instead of searching for each blueprint's modules.
+
+    :param app: Flask application instance
+    :type app: flask.app.Flask
+
+    :returns: str -- Path of the manifest
+    """
+
+    path = app.config['BLUEPRINT_MANIFEST']
+    blueprints = resolve_blueprints(app.config.get('BLUEPRINTS', []))
+
+    with open(path, 'w') as f:
+        json.dump({'blueprints': blueprints}, f, indent=4, sort_keys=True)
+
+    return path
+
+
+def read_blueprint_manifest(app):
+    """
+    Returns the blueprints listed in the ``BLUEPRINT_MANIFEST`` file, None
+    when there is no manifest.
+
+    :param app: Flask application instance
+    :type app: flask.app.Flask
+
+    :raises: soon.exceptions.ImproperlyConfigured -- The manifest does not
+             list the blueprints in ``BLUEPRINTS``, or is of an older format
+
+    :returns: list or None -- As returned by :py:func:`resolve_blueprints`
+    """
+
+    path = app.config.get('BLUEPRINT_MANIFEST')
+    if not path or not os.path.isfile(path):
+        return None
+
+    with open(path) as f:
+        blueprints = json.load(f)['blueprints']
+
+    names = [b.get('name') for b in blueprints]
+    if names != list(app.config.get('BLUEPRINTS', [])) or \
+            not all('modules' in b for b in blueprints):
+        raise ImproperlyConfigured(
+            '{0} does not match BLUEPRINTS, run manage.py '
+            'blueprint_manifest'.format(path))
+
+    return blueprints
+
 
 def load_models(blueprint):
     """
-    Load models from models.py of the blueprint module if it exist.
+    Load models from models.py of the blueprint module.
 
     :param blueprint: Python module path to module
     :type blueprint: str
     """
 
-    try:
-        __import__('{0}.models'.format(blueprint))
-    except ImportError:
-        # TODO: Log this at debug level
-        pass
+    __import__('{0}.models'.format(blueprint))
 
 
 def load_blueprint(app, blueprint):
@@ -67,12 +221,6 @@ def load_blueprint(app, blueprint):
             ('/', IndexView.as_view('index'))
         ]
 
-    Admin views can also be defined but are not required:
-
-        admin = [
-            HelloView(name='Hello', endpoint='hello', category='Hello')
-        ]
-
     :param app: Flask application instance
     :type app: flask.app.Flask
 
@@ -92,12 +240,28 @@ def load_blueprint(app, blueprint):
 
     app.register_blueprint(module.blueprint)
 
-    try:
-        for view in module.admin:
-            admin.add_view(view)
-    except AttributeError:
-        # TODO: Log later at debug info
-        pass
+
+def load_admin(blueprint):
+    """
+    Register admin views from admin.py of the blueprint module. Views should
+    be defined as a list named admin, for example:
+
+        admin = [
+            HelloView(name='Hello', endpoint='hello', category='Hello')
+        ]
+
+    Not imported in the public profile, which has no admin.
+
+    :param blueprint: Python module path to module
+    :type blueprint: str
+    """
+
+    module = __import__(
+        '{0}.admin'.format(blueprint),
+        fromlist=['soon'])
+
+    for view in getattr(module, 'admin', []):
+        admin.add_view(view)
 
 
 def register_extenstions(app):
@@ -109,39 +273,85 @@ def register_extenstions(app):
     """
 
     # Database (Flask-SQLAlchemy)
-    db.init_app(app)
+    with startup.timed('init Flask-SQLAlchemy'):
+        db.init_app(app)
+        read_replicas.init_app(app)
+        query_stats.init_app(app)
 
-    # Migrations
-    migrate.init_app(app, db)
+    # Migrations are registered by manage.py when its db command runs
 
     # Flask Security
-    from soon.auth.models import User, Role
-    datastore = SQLAlchemyUserDatastore(db, User, Role)
-    security.init_app(app, datastore=datastore)
+    with startup.timed('init Flask-Security'):
+        from soon.auth.models import User, Role
+        datastore = SQLAlchemyUserDatastore(db, User, Role)
+        # The admin index is the only login form, Flask-Security's own
+        # views would check passwords past login_throttle and hash_pool
+        security.init_app(app, datastore=datastore, register_blueprint=False)
+        hash_pool.init_app(app)
+        login_throttle.init_app(app)
+        session_users.init_app(app)
 
-    # Gravatar
-    gravatar.init_app(app)
+    global admin
 
-    # Admin
-    from flask.ext.admin import Admin
-    from soon.views.admin.home import AdminHomeView
+    if app.config['APP_PROFILE'] == 'full':
+        # Gravatar
+        with startup.timed('init Gravatar'):
+            from flask.ext.gravatar import Gravatar
 
-    global admin
+            Gravatar(app, size=100)
+
+        # Admin
+        with startup.timed('init Flask-Admin'):
+            from flask.ext.admin import Admin
+            from soon.views.admin.home import AdminHomeView
+
+            admin = Admin(
+                name='soon',
+                index_view=AdminHomeView(name='Dashboard'),
+                base_template='layout/admin.html')
+            admin.init_app(app)
+
+            # Flask-Login redirects to the admin login, not security.login
+            app.login_manager.login_view = 'admin.index'
 
-    admin = Admin(
-        name='soon',
-        index_view=AdminHomeView(name='Dashboard'),
-        base_template='layout/admin.html')
-    admin.init_app(app)
+        # Static Collect, registered as app.extensions['collect']
+        with startup.timed('init Flask-Collect'):
+            from flask.ext.collect import Collect
 
-    # Static Collect
-    collect.init_app(app)
+            Collect(app)
+    else:
+        admin = None
+
+    # Fingerprinted Static Assets
+    with startup.timed('init Assets'):
+        assets.init_app(app)
+
+    # Responsive Images
+    with startup.timed('init Responsive Images'):
+        responsive_images.init_app(app)
+
+    # Pre compressed Static / Dynamic Compression
+    with startup.timed('init Compression'):
+        compression.init_app(app)
 
     # Velox
-    velox.init_app(app)
+    with startup.timed('init Velox'):
+        velox.init_app(app)
+
+    # Rendered Response Cache
+    with startup.timed('init Response Cache'):
+        response_cache.init_app(app)
+
+    # Pre rendered Snapshots
+    with startup.timed('init Snapshots'):
+        snapshots.init_app(app)
 
+    # Deferred File Cleanup
+    with startup.timed('init File Cleanup'):
+        file_cleanup.init_app(app)
 
-def register_blueprints(app):
+
+def register_blueprints(app, manifest=True):
     """
     Load application blueprints from config, similar to Django INSTALLED_APPS
     setting which is literally a list of strings of python module paths.
@@ -149,50 +359,95 @@ def register_blueprints(app):
     Each blueprint can contain the following files:
 
         - __init__.py
-        - admin.py - routes for registering admin views
+        - admin.py - admin views, listed in a list named admin
         - models.py - SQL Alchemy models
         - routes.py - Instantiates the blueprint and contains a list named
-                      routes contain tuples of (url, view_func), also
-                      admin views should be defined in a list.
+                      routes contain tuples of (url, view_func).
+
+    Which modules exist is read from the ``BLUEPRINT_MANIFEST`` file when
+    one has been written by ``manage.py blueprint_manifest``, and checked
+    against each blueprint's directory, else found on each start up.
 
     :param app: Flask application instance
     :type app: flask.app.Flask
+
+    :param manifest: Read the manifest, if there is one
+    :type manifest: bool
+
+    :raises: soon.exceptions.ImproperlyConfigured -- The manifest is out of
+             date
     """
 
-    for blueprint in app.config.get('BLUEPRINTS', []):
-        load_models(blueprint)
-        load_blueprint(app, blueprint)
+    blueprints = read_blueprint_manifest(app) if manifest else None
+    checked = blueprints is not None
+    if blueprints is None:
+        blueprints = resolve_blueprints(app.config.get('BLUEPRINTS', []))
+
+    for entry in blueprints:
+        blueprint = entry['name']
+        with startup.timed('blueprint {0}'.format(blueprint)):
+            if checked:
+                package = __import__(blueprint, fromlist=['soon'])
+                if package_modules(package) != entry['modules']:
+                    raise ImproperlyConfigured(
+                        'Modules of {0} do not match {1}, run manage.py '
+                        'blueprint_manifest'.format(
+                            blueprint,
+                            app.config['BLUEPRINT_MANIFEST']))
+            if 'models' in entry['modules']:
+                load_models(blueprint)
+            load_blueprint(app, blueprint)
+            if 'admin' in entry['modules'] and admin is not None:
+                load_admin(blueprint)
 
 
 def register_media(app):
     """
-    Register media endpoints to be served by werkzeug in development,
-    do not use for production.
+    Register the media endpoint. Stored names are resolved and authorised by
+    the application, so ``MEDIA_SERVE`` must be set, it defaults to ``app``
+    in DEBUG.
 
     :param app: Flask application instance
     :type app: flask.app.Flask
+
+    :raises: soon.exceptions.ImproperlyConfigured -- ``MEDIA_SERVE`` is not
+             set outside DEBUG or is not one of ``MEDIA_SERVE_MODES``
     """
 
-    app.add_url_rule(
-        '{0}/<filename>'.format(app.config['MEDIA_URL']),
-        'media',
-        build_only=True)
+    rule = '{0}/<path:filename>'.format(app.config['MEDIA_URL'])
+
+    if app.config.get('MEDIA_SERVE') is None:
+        if not app.config['DEBUG']:
+            # The front server cannot map jobs/<sha>/<name>.pdf urls to the
+            # jobs/<sha>.pdf files holding their content
+            raise ImproperlyConfigured(
+                'MEDIA_SERVE must be set outside DEBUG, media urls are '
+                'resolved by the application')
+        app.config['MEDIA_SERVE'] = 'app'
 
-    # Only server from the app if in DEBUG
-    if app.config['DEBUG']:
-        app.wsgi_app = SharedDataMiddleware(app.wsgi_app, {
-            app.config['MEDIA_URL']:  app.config['MEDIA_ROOT']
-        })
+    if app.config['MEDIA_SERVE'] not in MEDIA_SERVE_MODES:
+        raise ImproperlyConfigured('MEDIA_SERVE must be one of {0}'.format(
+            ', '.join(repr(mode) for mode in MEDIA_SERVE_MODES)))
 
+    app.add_url_rule(rule, 'media', view_func=media)
 
-def create_app(config=None):
+
+def create_app(config=None, profile=None, manifest=True):
     """
     Create a flask application, optionally passing in a path to a separate
-    config file to override existing configuration
+    config file to override existing configuration. The ``public`` profile
+    leaves out the admin, Gravatar and Flask-Collect so processes only
+    serving the public site start faster.
 
     :param config: Path to config file
     :type config: str
 
+    :param profile: One of ``APP_PROFILES``, else the ``APP_PROFILE`` setting
+    :type profile: str
+
+    :param manifest: Load blueprints from the ``BLUEPRINT_MANIFEST``
+    :type manifest: bool
+
     :returns: flask.app.Flask -- Flask application
     """
 
@@ -202,11 +457,17 @@ def create_app(config=None):
     # Load Configuration
     load_config(app)
 
+    if profile is not None:
+        app.config['APP_PROFILE'] = profile
+    if app.config['APP_PROFILE'] not in APP_PROFILES:
+        raise ImproperlyConfigured('APP_PROFILE must be one of {0}'.format(
+            ', '.join(APP_PROFILES)))
+
     # Initialize extensions
     register_extenstions(app)
 
     # Dynamically load blueprints
-    register_blueprints(app)
+    register_blueprints(app, manifest)
 
     # Media endooints
     register_media(app)
@@ -218,4 +479,7 @@ def create_app(config=None):
     # Register Resident Advisor (Portfolio)
     app.add_url_rule('/residentadvisor/', view_func=residentadvisor.as_view('residentadvisor'))
 
+    if startup.enabled:
+        startup.report()
+
     return app
@@ -7,31 +7,83 @@
               running a local development server.
 """
 
+import os
 import re
 import sys
 
-from flask.ext.migrate import Migrate, MigrateCommand
-from flask.ext.script import Manager, prompt, prompt_pass, Shell, Server
+from flask.ext.script import (
+    Command,
+    Manager,
+    prompt,
+    prompt_pass,
+    Shell,
+    Server)
 from flask.ext.security import SQLAlchemyUserDatastore
 from flask.ext.security.utils import encrypt_password
-from soon.ext import collect, db
-from soon.loader import create_app
+from soon.assets.images import build_variants
+from soon.db.explain import explain_known
+from soon.db.transfer import (
+    export_rows as export_table,
+    FORMATS,
+    guess_format,
+    import_rows as import_table)
+from soon.ext import db, file_cleanup, snapshots
+from soon.jobs.models import Job
+from soon.jobs.storage import spec_store
+from soon.loader import create_app, write_blueprint_manifest
+from soon.warmup import compile_templates as precompile_templates
 from soon.auth.models import User, Role
 
 
-app = create_app()
+# blueprint_manifest replaces the manifest, a stale one must not stop it
+app = create_app(manifest=sys.argv[1:2] != ['blueprint_manifest'])
 manager = Manager(app)
-migrate = Migrate(app, db)
-collect.init_script(manager)
+
+# Flask-Collect is left out of the public profile
+if 'collect' in app.extensions:
+    app.extensions['collect'].init_script(manager)
 
 
 EMAIL_REGEX = re.compile(r"[^@]+@[^@]+\.[^@]+")
 
+# Models import_rows and export_rows transfer
+TRANSFER_MODELS = {
+    'jobs': Job,
+    'users': User,
+}
+
 
 # Override runserver command so we bind to all interfaces
 manager.add_command("runserver", Server(host="0.0.0.0", port=5000))
 
 
+def add_migrate_command():
+    """
+    Add Flask-Migrate's db command, its import loads Alembic which dominates
+    the start up of every other command so it is only added when run
+    """
+
+    from flask.ext.migrate import Migrate, MigrateCommand
+
+    Migrate(app, db)
+    manager.add_command('db', MigrateCommand)
+
+
+class Migrations(Command):
+    """
+    Perform database migrations
+    """
+
+    capture_all_args = True
+
+    def run(self, args):
+        # Listed in place of the db command, which is added when manage.py is
+        # run with db. Its arguments are parsed again by the real command.
+        add_migrate_command()
+
+        return manager.handle(sys.argv[0], ['db'] + args)
+
+
 def _make_context():
     """
     Return context dict for a shell session so you can access
@@ -93,8 +145,165 @@ def createsuperuser():
     db.session.commit()
 
 
+@manager.command
+def blueprint_manifest():
+    """
+    Record the modules of each blueprint so start up need not search for them
+    """
+
+    print(write_blueprint_manifest(app))
+
+
+@manager.command
+def compile_templates():
+    """
+    Compile every template into the template bytecode cache, run on deploy
+    """
+
+    if not app.config.get('TEMPLATE_BYTECODE_DIR'):
+        sys.exit('TEMPLATE_BYTECODE_DIR is not set')
+
+    count = precompile_templates(app)
+    print('{0} templates compiled to {1}'.format(
+        count,
+        app.config['TEMPLATE_BYTECODE_DIR']))
+
+
+@manager.command
+def snapshot():
+    """
+    Render template only pages to static HTML snapshots
+    """
+
+    for path in snapshots.build(app):
+        print(path)
+
+
+@manager.command
+def images():
+    """
+    Recompress images and generate responsive variants, run before collect
+    """
+
+    build_variants(app, verbose=True)
+
+
+@manager.command
+def store_specs():
+    """
+    Move job specs uploaded before the content store into it
+    """
+
+    for job in Job.query:
+        if spec_store.digest(job.spec) is not None:
+            continue
+
+        path = os.path.join(app.config['MEDIA_ROOT'], job.spec)
+        if not os.path.isfile(path):
+            print('Missing: {0}'.format(job.spec))
+            continue
+
+        # The old file is removed by the job update event once unreferenced
+        with open(path, 'rb') as f:
+            job.spec = spec_store.save(f, os.path.basename(path))
+        print(job.spec)
+
+    db.session.commit()
+
+
+@manager.command
+def sweep_files():
+    """
+    Delete uploaded files no longer referenced, run periodically from cron
+    """
+
+    print('Checked {0} files'.format(file_cleanup.sweep()))
+
+
+@manager.command
+def explain():
+    """
+    Show query plans of the known queries, flagging full table scans
+    """
+
+    flagged = 0
+
+    for plan in explain_known():
+        print('{0}{1}'.format(plan.name, ' [SCAN]' if plan.flagged else ''))
+        for line in plan.lines:
+            print('    {0}'.format(line))
+        flagged += plan.flagged
+
+    if flagged:
+        sys.exit('\n{0} queries scan whole tables'.format(flagged))
+
+
+def _transfer_args(model, path, format):
+    if model not in TRANSFER_MODELS:
+        sys.exit('Unknown model, choose from: {0}'.format(
+            ', '.join(sorted(TRANSFER_MODELS))))
+
+    format = format or guess_format(path)
+    if format not in FORMATS:
+        sys.exit('Unknown format, choose from: {0}'.format(
+            ', '.join(FORMATS)))
+
+    return TRANSFER_MODELS[model], format
+
+
+@manager.command
+def export_rows(model, path, format=None):
+    """
+    Export jobs or users to a JSON Lines or CSV file, - for stdout
+    """
+
+    model, format = _transfer_args(model, path, format)
+
+    out = sys.stdout if path == '-' else open(path, 'wb')
+    try:
+        count = export_table(
+            model,
+            out,
+            format,
+            app.config['TRANSFER_BATCH_SIZE'])
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    sys.stderr.write('Exported {0} rows\n'.format(count))
+
+
+@manager.command
+def import_rows(model, path, format=None):
+    """
+    Import jobs or users from a JSON Lines or CSV file, - for stdin. Plain
+    text passwords are hashed, hashes are kept.
+    """
+
+    model, format = _transfer_args(model, path, format)
+
+    lines = sys.stdin if path == '-' else open(path, 'rb')
+    try:
+        count = import_table(
+            model,
+            lines,
+            format,
+            app.config['TRANSFER_BATCH_SIZE'],
+            app.config['TRANSFER_HASH_PROCESSES'])
+    except ValueError as e:
+        sys.exit('Import failed, earlier batches are committed: {0}'.format(e))
+    finally:
+        if lines is not sys.stdin:
+            lines.close()
+
+    print('Imported {0} rows'.format(count))
+
+
 manager.add_command("server", Server())
-manager.add_command('db', MigrateCommand)
+if sys.argv[1:2] == ['db']:
+    add_migrate_command()
+else:
+    manager.add_command('db', Migrations())
 manager.add_command("shell", Shell(make_context=_make_context))
 
 
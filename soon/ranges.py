@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: soon.ranges
+   :synopsis: Send files with HTTP Range / If-Range support, partial content
+              is streamed in chunks so memory per request stays flat
+"""
+
+import mimetypes
+import os
+import uuid
+
+from datetime import datetime
+
+from flask import current_app, request, send_file
+from werkzeug.http import http_date, is_resource_modified, parse_range_header
+
+
+def file_etag(stat):
+    """
+    ETag for a file derived from its modification time and size
+
+    :param stat: Result of ``os.stat`` for the file
+    :type stat: posix.stat_result
+
+    :returns: str
+    """
+
+    return '{0:x}-{1:x}'.format(int(stat.st_mtime), stat.st_size)
+
+
+def satisfiable_ranges(header, length):
+    """
+    Parse a Range header into a list of ``(start, stop)`` byte offsets
+    within a file of ``length`` bytes, stop being exclusive. Returns None when
+    the header is missing, malformed, not in bytes or asks for more than
+    ``MEDIA_MAX_RANGES`` ranges, in which case it should be ignored, and an
+    empty list when no range can be satisfied.
+
+    :param header: Range header value
+    :type header: str
+
+    :param length: File length in bytes
+    :type length: int
+
+    :returns: list or None
+    """
+
+    try:
+        rng = parse_range_header(header)
+    except ValueError:
+        return None
+
+    if rng is None or rng.units != 'bytes' or \
+            len(rng.ranges) > current_app.config['MEDIA_MAX_RANGES']:
+        return None
+
+    ranges = []
+
+    for start, stop in rng.ranges:
+        if start < 0:
+            # Suffix range, the last N bytes
+            start, stop = max(length + start, 0), length
+        else:
+            stop = length if stop is None else min(stop, length)
+        if start < stop:
+            ranges.append((start, stop))
+
+    return ranges
+
+
+def if_range_matches(etag, last_modified):
+    """
+    Returns True if there is no If-Range header or it matches the current
+    version of the file, else the full file must be sent.
+    """
+
+    if_range = request.if_range
+
+    if if_range.etag is not None:
+        return if_range.etag == etag
+    if if_range.date is not None:
+        return if_range.date == last_modified
+
+    return True
+
+
+def read_chunks(path, ranges, chunk_size, prefixes=None, suffix=None):
+    """
+    Generator yielding the requested byte ranges of a file in chunks of at
+    most ``chunk_size``. Optional per range ``prefixes`` and a final
+    ``suffix`` are yielded around the data for multipart responses. The file
+    is closed when the generator is exhausted or closed by the WSGI server.
+    """
+
+    with open(path, 'rb') as f:
+        for i, (start, stop) in enumerate(ranges):
+            if prefixes:
+                yield prefixes[i]
+            f.seek(start)
+            remaining = stop - start
+            while remaining > 0:
+                chunk = f.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+        if suffix:
+            yield suffix
+
+
+def send_file_ranged(path, mimetype=None):
+    """
+    Send a file supporting conditional and Range requests. Requests without
+    a (valid) Range are sent whole by :py:func:`flask.send_file`, through the
+    WSGI server's file wrapper. A single range is sent as ``206 Partial
+    Content``, several as ``multipart/byteranges``, both streamed from the
+    file in ``MEDIA_CHUNK_SIZE`` chunks.
+
+    :param path: Absolute path of the file
+    :type path: str
+
+    :param mimetype: Mime type, guessed from the file name if not given
+    :type mimetype: str
+
+    :returns: flask.wrappers.Response
+    """
+
+    mimetype = mimetype or mimetypes.guess_type(path)[0] or \
+        'application/octet-stream'
+
+    stat = os.stat(path)
+    length = stat.st_size
+    etag = file_etag(stat)
+    last_modified = datetime.utcfromtimestamp(int(stat.st_mtime))
+
+    ranges = None
+    if 'HTTP_RANGE' in request.environ:
+        if is_resource_modified(
+                request.environ,
+                etag=etag,
+                last_modified=last_modified) and \
+                if_range_matches(etag, last_modified):
+            ranges = satisfiable_ranges(
+                request.environ.get('HTTP_RANGE'),
+                length)
+
+    if ranges is None:
+        response = send_file(
+            path,
+            mimetype=mimetype,
+            add_etags=False,
+            conditional=False)
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        response.headers['Accept-Ranges'] = 'bytes'
+        return response.make_conditional(request)
+
+    if not ranges:
+        response = current_app.response_class(status=416)
+        response.headers['Content-Range'] = 'bytes */{0}'.format(length)
+        return response
+
+    chunk_size = current_app.config['MEDIA_CHUNK_SIZE']
+
+    if len(ranges) == 1:
+        start, stop = ranges[0]
+        response = current_app.response_class(
+            read_chunks(path, ranges, chunk_size),
+            status=206,
+            mimetype=mimetype,
+            direct_passthrough=True)
+        response.headers['Content-Range'] = 'bytes {0}-{1}/{2}'.format(
+            start, stop - 1, length)
+        response.headers['Content-Length'] = str(stop - start)
+    else:
+        boundary = uuid.uuid4().hex
+        prefixes = [
+            '--{0}\r\nContent-Type: {1}\r\n'
+            'Content-Range: bytes {2}-{3}/{4}\r\n\r\n'.format(
+                boundary, mimetype, start, stop - 1, length).encode('ascii')
+            for start, stop in ranges]
+        # Each part is followed by a CRLF before the next boundary
+        prefixes = prefixes[:1] + [b'\r\n' + p for p in prefixes[1:]]
+        suffix = '\r\n--{0}--\r\n'.format(boundary).encode('ascii')
+
+        response = current_app.response_class(
+            read_chunks(path, ranges, chunk_size, prefixes, suffix),
+            status=206,
+            mimetype='multipart/byteranges; boundary={0}'.format(boundary),
+            direct_passthrough=True)
+        response.headers['Content-Length'] = str(
+            sum(len(p) for p in prefixes) + len(suffix) +
+            sum(stop - start for start, stop in ranges))
+
+    response.set_etag(etag)
+    response.headers['Last-Modified'] = http_date(last_modified)
+    response.headers['Accept-Ranges'] = 'bytes'
+
+    return response
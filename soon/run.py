@@ -5,11 +5,26 @@
    :synopsis: Spawn application for uWSGI
 """
 
+from soon.ext import db
 from soon.loader import create_app
+from soon.warmup import warmup
 
 
 app = create_app()
 
+# Done once here rather than in each worker uWSGI forks, also closes the
+# connections opened while loading
+warmup(app)
+
+try:
+    from uwsgidecorators import postfork
+except ImportError:
+    pass
+else:
+    @postfork
+    def reset_pool():
+        db.dispose(app)
+
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0')
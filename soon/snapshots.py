@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: soon.snapshots
+   :synopsis: Pre rendered HTML snapshots of template only routes, built
+              with ``manage.py snapshot`` and served without touching Jinja
+"""
+
+import hashlib
+import os
+import threading
+
+from flask import current_app, request
+from flask.ext.velox.views.template import TemplateView
+from soon.compression import precompress
+
+
+class Snapshots(object):
+    """
+    Renders routes backed by a plain ``TemplateView`` (no arguments, no
+    database access) to HTML files under ``SNAPSHOT_ROOT`` at build time.
+    Files are written as ``<SNAPSHOT_ROOT>/<path>/index.html`` so a front
+    proxy can serve them directly, for example in nginx:
+
+        try_files /snapshots$uri/index.html @app;
+
+    When ``SNAPSHOT_SERVE`` is ``True`` the application serves the snapshot
+    bytes itself, read from disk once per process.
+    """
+
+    def __init__(self, app=None):
+        self._pages = {}
+        self._endpoints = None
+        self._lock = threading.Lock()
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Register the snapshot server with the application
+
+        :param app: Flask application instance
+        :type app: flask.app.Flask
+        """
+
+        app.extensions['snapshots'] = self
+        app.before_request(self.serve)
+
+    def rules(self, app):
+        """
+        Returns url rules of template only views which can be snapshot
+
+        :param app: Flask application instance
+        :type app: flask.app.Flask
+
+        :returns: list -- werkzeug.routing.Rule instances
+        """
+
+        rules = []
+
+        for rule in app.url_map.iter_rules():
+            view = app.view_functions.get(rule.endpoint)
+            view_class = getattr(view, 'view_class', None)
+
+            if view_class is None or not issubclass(view_class, TemplateView):
+                continue
+            if rule.arguments or 'GET' not in rule.methods:
+                continue
+
+            rules.append(rule)
+
+        return rules
+
+    def path(self, app, url):
+        """
+        Absolute path of the snapshot file for a url path
+
+        :param app: Flask application instance
+        :type app: flask.app.Flask
+
+        :param url: Url path, e.g ``/peabody/``
+        :type url: str
+
+        :returns: str -- Absolute file path
+        """
+
+        return os.path.join(
+            app.config['SNAPSHOT_ROOT'],
+            url.strip('/'),
+            'index.html')
+
+    def build(self, app):
+        """
+        Render every template only route to its snapshot file
+
+        :param app: Flask application instance
+        :type app: flask.app.Flask
+
+        :returns: list -- Paths of the written files
+        """
+
+        written = []
+
+        for rule in self.rules(app):
+            with app.test_request_context(rule.rule):
+                response = app.make_response(
+                    app.view_functions[rule.endpoint]())
+
+            path = self.path(app, rule.rule)
+            directory = os.path.dirname(path)
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+
+            with open(path, 'wb') as f:
+                f.write(response.get_data())
+
+            # gzip / brotli siblings for the front proxy
+            precompress(path)
+
+            written.append(path)
+
+        with self._lock:
+            self._pages.clear()
+
+        return written
+
+    def load(self, url):
+        """
+        Returns the snapshot bytes and ETag for a url path or None if no
+        snapshot has been built, results are held in memory.
+
+        :param url: Url path, e.g ``/peabody/``
+        :type url: str
+
+        :returns: tuple or None -- bytes, etag
+        """
+
+        try:
+            return self._pages[url]
+        except KeyError:
+            pass
+
+        try:
+            with open(self.path(current_app, url), 'rb') as f:
+                body = f.read()
+        except IOError:
+            return None
+
+        page = body, hashlib.md5(body).hexdigest()
+
+        with self._lock:
+            self._pages[url] = page
+
+        return page
+
+    def serve(self):
+        """
+        ``before_request`` hook returning the snapshot of the matched template
+        only route when ``SNAPSHOT_SERVE`` is enabled.
+        """
+
+        if not current_app.config['SNAPSHOT_SERVE']:
+            return None
+        if request.method not in ('GET', 'HEAD') or request.url_rule is None:
+            return None
+        if self._endpoints is None:
+            self._endpoints = frozenset(
+                rule.endpoint for rule in self.rules(current_app))
+        if request.endpoint not in self._endpoints:
+            return None
+
+        page = self.load(request.url_rule.rule)
+        if page is None:
+            return None
+
+        body, etag = page
+        response = current_app.response_class(body, mimetype='text/html')
+        response.set_etag(etag)
+
+        return response.make_conditional(request)
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: soon.startup
+   :synopsis: Records how long application start up spends importing and
+              initialising each extension and blueprint
+"""
+
+import __builtin__
+import os
+import sys
+import time
+
+from contextlib import contextmanager
+
+
+class StartupProfile(object):
+    """
+    Enabled by the ``SOON_STARTUP_PROFILE`` environment variable, which must
+    be set before ``soon`` is imported so module imports are covered. While
+    enabled every import made by a ``soon`` module of another package is
+    timed, including what that package imports in turn, as is each block
+    wrapped in :py:meth:`timed`. Each entry records its self time, time
+    spent in timed imports or blocks nested within it is recorded against
+    those only, so entries add up to no more than the total.
+    :py:func:`soon.loader.create_app` writes the report to stderr once the
+    application is created, which ends the timing of imports.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.started = time.time()
+        self.timings = {}
+        self._import = None
+        # Time spent in nested entries, per entry being measured
+        self._nested = []
+
+        if enabled:
+            self.install()
+
+    def install(self):
+        """
+        Start timing imports made by ``soon`` modules
+        """
+
+        if self._import is not None:
+            return
+
+        self._import = __builtin__.__import__
+
+        def timed_import(name, globals=None, *args, **kwargs):
+            importer = (globals or {}).get('__name__') or ''
+            if not importer.startswith('soon') or name.startswith('soon') or \
+                    name in sys.modules:
+                return self._import(name, globals, *args, **kwargs)
+
+            with self._measure('import {0}'.format(name)):
+                return self._import(name, globals, *args, **kwargs)
+
+        __builtin__.__import__ = timed_import
+
+    def uninstall(self):
+        """
+        Stop timing imports
+        """
+
+        if self._import is not None:
+            __builtin__.__import__ = self._import
+            self._import = None
+
+    def add(self, name, elapsed):
+        self.timings[name] = self.timings.get(name, 0.0) + elapsed
+
+    @contextmanager
+    def _measure(self, name):
+        """
+        Record the self time of the wrapped code, excluding entries measured
+        within it
+        """
+
+        start = time.time()
+        self._nested.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = time.time() - start
+            self.add(name, elapsed - self._nested.pop())
+            if self._nested:
+                self._nested[-1] += elapsed
+
+    @contextmanager
+    def timed(self, name):
+        """
+        Context manager timing a step of start up
+
+        :param name: Name of the step, e.g. ``init Flask-Admin``
+        :type name: str
+        """
+
+        if not self.enabled:
+            yield
+            return
+
+        with self._measure(name):
+            yield
+
+    def report(self, out=None):
+        """
+        Write the timings, slowest first, and the total time since ``soon``
+        was imported. Imports are no longer timed after.
+
+        :param out: File to write to, stderr by default
+        :type out: file
+        """
+
+        self.uninstall()
+
+        out = out or sys.stderr
+        total = time.time() - self.started
+
+        out.write(
+            'Startup profile, self times of {0:.1f} ms since import of '
+            'soon\n'.format(total * 1000))
+        for name, elapsed in sorted(
+                self.timings.items(),
+                key=lambda t: t[1],
+                reverse=True):
+            out.write('{0:>10.1f} ms  {1}\n'.format(elapsed * 1000, name))
+
+
+startup = StartupProfile(bool(os.environ.get('SOON_STARTUP_PROFILE')))
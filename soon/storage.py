@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: soon.storage
+   :synopsis: Content addressed storage for uploaded files, each unique file
+              is stored once however many times it is uploaded
+"""
+
+import hashlib
+import os
+import posixpath
+import re
+import tempfile
+import time
+
+from flask import current_app
+from werkzeug import secure_filename
+
+
+# Stored names are <directory>/<sha256>/<human file name>
+HASH_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+class ContentStore(object):
+    """
+    Stores uploads under ``MEDIA_ROOT/<directory>`` by the SHA-256 digest of
+    their content. The name recorded against a model keeps the uploaded file
+    name so URLs stay readable, ``jobs/<digest>/spec.pdf``, while the bytes
+    live once in the blob ``jobs/<digest>.pdf``. Names stored before the
+    content store existed are treated as plain paths.
+
+    :param directory: Directory within ``MEDIA_ROOT``, e.g ``jobs``
+    :type directory: str
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    @property
+    def root(self):
+        return os.path.join(current_app.config['MEDIA_ROOT'], self.directory)
+
+    def digest(self, name):
+        """
+        Returns the content digest of a stored name, None for names stored
+        before the content store existed.
+
+        :param name: Stored name, relative to ``MEDIA_ROOT``
+        :type name: str
+
+        :returns: str or None
+        """
+
+        parts = name.split('/')
+        if len(parts) == 3 and parts[0] == self.directory and \
+                HASH_RE.match(parts[1]):
+            return parts[1]
+
+        return None
+
+    def blob(self, name):
+        """
+        Returns the path of the blob holding the content of a stored name,
+        relative to ``MEDIA_ROOT``
+
+        :param name: Stored name, relative to ``MEDIA_ROOT``
+        :type name: str
+
+        :returns: str
+        """
+
+        digest = self.digest(name)
+        if digest is None:
+            return name
+
+        ext = os.path.splitext(name)[1].lower()
+
+        return posixpath.join(self.directory, digest + ext)
+
+    def pattern(self, blob):
+        """
+        Returns a SQL ``LIKE`` pattern matching every stored name whose
+        content is in ``blob``, used to count references to it.
+
+        :param blob: Blob name, relative to ``MEDIA_ROOT``
+        :type blob: str
+
+        :returns: str
+        """
+
+        root = os.path.splitext(posixpath.basename(blob))[0]
+        if posixpath.dirname(blob) == self.directory and HASH_RE.match(root):
+            return u'{0}/{1}/%'.format(self.directory, root)
+
+        return blob.replace('\\', '\\\\').replace('%', '\\%') \
+            .replace('_', '\\_')
+
+    def blobs(self, grace=0):
+        """
+        Yield the names of blobs and stale temporary uploads in the store,
+        relative to ``MEDIA_ROOT``, skipping files modified in the last
+        ``grace`` seconds.
+
+        :param grace: Age in seconds below which files are skipped
+        :type grace: int
+
+        :returns: generator
+        """
+
+        if not os.path.isdir(self.root):
+            return
+
+        limit = time.time() - grace
+
+        for filename in sorted(os.listdir(self.root)):
+            path = os.path.join(self.root, filename)
+            if os.path.isfile(path) and os.path.getmtime(path) < limit:
+                yield posixpath.join(self.directory, filename)
+
+    def save(self, stream, filename, chunk_size=64 * 1024):
+        """
+        Stream a file into the store, hashing it as it is written to a
+        temporary file which is then renamed to its blob, or discarded when
+        the blob already exists.
+
+        :param stream: File like object to read the content from
+        :type stream: file
+
+        :param filename: Uploaded file name
+        :type filename: str
+
+        :returns: str -- Stored name, relative to ``MEDIA_ROOT``
+        """
+
+        if not os.path.isdir(self.root):
+            os.makedirs(self.root)
+
+        sha = hashlib.sha256()
+
+        # Same directory as the blobs so the rename is atomic
+        fd, tmp = tempfile.mkstemp(dir=self.root, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in iter(lambda: stream.read(chunk_size), b''):
+                    sha.update(chunk)
+                    f.write(chunk)
+
+            name = u'/'.join([
+                self.directory,
+                sha.hexdigest(),
+                secure_filename(filename) or 'file'])
+            path = os.path.join(
+                current_app.config['MEDIA_ROOT'],
+                self.blob(name))
+
+            if os.path.exists(path):
+                # Refreshed so a sweep does not take it for an old orphan
+                os.utime(path, None)
+                os.remove(tmp)
+            else:
+                # mkstemp creates files private to the owner, blobs are
+                # read by the front server too
+                os.chmod(tmp, 0o644)
+                os.rename(tmp, path)
+        except:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+        return name
+
+    def delete(self, name, grace=0):
+        """
+        Unlink the blob of a stored name, callers must check it is no longer
+        referenced. A blob modified in the last ``grace`` seconds is kept,
+        :py:meth:`save` refreshes it for uploads of the same content which
+        may not be committed yet.
+
+        :param name: Stored name, relative to ``MEDIA_ROOT``
+        :type name: str
+
+        :param grace: Age in seconds below which the blob is kept
+        :type grace: int
+
+        :returns: bool -- True if the blob was deleted
+        """
+
+        path = os.path.join(
+            current_app.config['MEDIA_ROOT'],
+            self.blob(name))
+
+        try:
+            if grace and os.path.getmtime(path) >= time.time() - grace:
+                return False
+            os.remove(path)
+        except OSError:
+            return False
+
+        return True
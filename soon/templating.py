@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: soon.templating
+   :synopsis: Jinja bytecode cache shared by every process of the application
+"""
+
+import errno
+import os
+import tempfile
+
+from jinja2 import FileSystemBytecodeCache
+
+
+class TemplateBytecodeCache(FileSystemBytecodeCache):
+    """
+    Jinja bytecode cache stored in a directory shared by every process, so a
+    template is compiled once per change of its source rather than once per
+    worker. Entries are keyed by template name and file, and hold a hash of
+    the source they were compiled from, an edited template is compiled again.
+
+    The directory is created when first written to, and entries are written
+    to a temporary file renamed into place so workers never read one half
+    written. Entries are readable by the same users as any file the process
+    creates, workers may run as a different user to ``manage.py
+    compile_templates``. An entry which cannot be read or written is a cache
+    miss, the template is compiled in memory instead.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(TemplateBytecodeCache, self).__init__(*args, **kwargs)
+
+        # mkstemp creates files only their owner can read, entries get the
+        # mode open would have given them
+        umask = os.umask(0)
+        os.umask(umask)
+        self.mode = 0o666 & ~umask
+
+    def load_bytecode(self, bucket):
+        try:
+            super(TemplateBytecodeCache, self).load_bytecode(bucket)
+        except (IOError, OSError):
+            bucket.reset()
+
+    def dump_bytecode(self, bucket):
+        try:
+            self._write_bytecode(bucket)
+        except (IOError, OSError):
+            pass
+
+    def _write_bytecode(self, bucket):
+        try:
+            os.makedirs(self.directory)
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+        fd, path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                bucket.write_bytecode(f)
+            os.chmod(path, self.mode)
+            os.rename(path, self._get_cache_filename(bucket))
+        except Exception:
+            os.unlink(path)
+            raise
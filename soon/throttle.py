@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: soon.throttle
+   :synopsis: Token bucket rate limiting of login attempts by client IP and
+              email, held in process or in a SQLite file shared by workers
+"""
+
+import sqlite3
+import threading
+import time
+
+from collections import OrderedDict
+
+from flask import current_app
+
+
+class MemoryBackend(object):
+    """
+    Token buckets held in this process as ``(tokens, time stamp)`` tuples,
+    the least recently used buckets are evicted beyond ``max_keys`` so a
+    flood of distinct keys can not exhaust memory. An evicted bucket starts
+    again full.
+
+    :param max_keys: Number of buckets to keep
+    :type max_keys: int
+    """
+
+    def __init__(self, max_keys):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, burst, rate, now):
+        """
+        Take a token from a bucket, returns False if it is empty
+
+        :param key: Bucket key
+        :type key: str
+
+        :param burst: Bucket capacity
+        :type burst: int
+
+        :param rate: Tokens added per second
+        :type rate: float
+
+        :param now: Current time stamp
+        :type now: float
+
+        :returns: bool
+        """
+
+        with self._lock:
+            tokens, stamp = self._buckets.pop(key, (burst, now))
+            tokens = min(burst, tokens + (now - stamp) * rate)
+
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+
+        return allowed
+
+
+class SQLiteBackend(object):
+    """
+    Token buckets in a SQLite file so every worker process on a host shares
+    the same limits. Buckets unused for longer than it takes them to refill
+    are deleted as they carry no state.
+
+    :param path: Path of the SQLite database file
+    :type path: str
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    @property
+    def connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self.path,
+                timeout=5,
+                isolation_level=None)
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS buckets ('
+                'key TEXT PRIMARY KEY, tokens REAL, stamp REAL)')
+            self._local.connection = connection
+
+        return connection
+
+    def consume(self, key, burst, rate, now):
+        """
+        Take a token from a bucket, returns False if it is empty. See
+        :py:meth:`MemoryBackend.consume`.
+        """
+
+        connection = self.connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute(
+                'SELECT tokens, stamp FROM buckets WHERE key = ?',
+                (key, )).fetchone()
+            tokens, stamp = row or (burst, now)
+            tokens = min(burst, tokens + (now - stamp) * rate)
+
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+
+            connection.execute(
+                'INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)',
+                (key, tokens, now))
+            connection.execute(
+                'DELETE FROM buckets WHERE stamp < ?',
+                (now - burst / rate, ))
+        except:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+        return allowed
+
+
+class LoginThrottle(object):
+    """
+    Limits login attempts per client IP and per email address. Each key has
+    a bucket holding ``burst`` attempts refilled over ``period`` seconds as
+    set in ``LOGIN_THROTTLE_LIMITS``, an attempt is refused when either
+    bucket is empty. Buckets are kept in process unless
+    ``LOGIN_THROTTLE_STORAGE`` names a SQLite file to share them between
+    processes.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """
+        Register the throttle with the application
+
+        :param app: Flask application instance
+        :type app: flask.app.Flask
+        """
+
+        if app.config['LOGIN_THROTTLE_STORAGE']:
+            self.backend = SQLiteBackend(app.config['LOGIN_THROTTLE_STORAGE'])
+        else:
+            self.backend = MemoryBackend(app.config['LOGIN_THROTTLE_MAX_KEYS'])
+
+        app.extensions['login_throttle'] = self
+
+    def allow(self, ip, email):
+        """
+        Record a login attempt, returns False if it should be refused
+
+        :param ip: Client IP address
+        :type ip: str
+
+        :param email: Email address the attempt is for
+        :type email: str
+
+        :returns: bool
+        """
+
+        config = current_app.config
+        if not config['LOGIN_THROTTLE_ENABLED']:
+            return True
+
+        now = time.time()
+        allowed = True
+
+        for scope, value in [('ip', ip), ('email', (email or '').lower())]:
+            burst, period = config['LOGIN_THROTTLE_LIMITS'][scope]
+            if not self.backend.consume(
+                    u'{0}:{1}'.format(scope, value),
+                    burst,
+                    burst / float(period),
+                    now):
+                allowed = False
+
+        return allowed
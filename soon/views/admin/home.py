@@ -5,12 +5,17 @@
    :synopsis: Base admin views
 """
 
+import os
+
+from flask import abort, jsonify
 from flask.ext import admin
-from flask.ext.admin import expose_plugview
-from flask.ext.login import logout_user
+from flask.ext.admin import expose, expose_plugview
+from flask.ext.login import current_user, logout_user
 from flask.ext.velox.admin.views.forms import AdminFormView
 from flask.ext.velox.views.http import RedirectView
 from soon.auth.forms import AuthenticationForm
+from soon.db.pool import pool_status
+from soon.ext import db, query_stats
 
 
 class AdminHomeView(admin.AdminIndexView):
@@ -27,3 +32,26 @@ class AdminHomeView(admin.AdminIndexView):
 
         def pre_dispatch(self):
             logout_user()
+
+    @expose('/pool')
+    def pool(self):
+        """
+        Connection pool metrics of the worker process serving the request
+        """
+
+        if not (current_user.is_authenticated() and current_user.is_admin):
+            abort(404)
+
+        return jsonify(pid=os.getpid(), **pool_status(db.engine))
+
+    @expose('/queries')
+    def queries(self):
+        """
+        Query counts and times per endpoint of the worker process serving
+        the request
+        """
+
+        if not (current_user.is_authenticated() and current_user.is_admin):
+            abort(404)
+
+        return jsonify(pid=os.getpid(), endpoints=query_stats.endpoints())
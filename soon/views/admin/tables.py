@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: soon.views.admin.tables
+   :synopsis: Admin model tables paginated by keyset rather than OFFSET
+"""
+
+import base64
+import datetime
+import json
+
+from collections import namedtuple
+
+from flask import request, url_for
+from flask.ext.velox.admin.views.sqla.read import AdminModelTableView
+from soon.ext import read_replicas
+from sqlalchemy import and_, asc, desc, or_
+
+
+#: A page of a keyset paginated table
+KeysetPage = namedtuple('KeysetPage', [
+    'items',
+    'sort',
+    'direction',
+    'next',
+    'prev',
+    'total'])
+
+DATETIME_FORMATS = ['%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S']
+
+
+def encode_cursor(value, id):
+    """
+    Encode the sort value and primary key of a row into a URL safe cursor
+
+    :param value: Value of the sort column
+    :type value: object
+
+    :param id: Primary key
+    :type id: int
+
+    :returns: str
+    """
+
+    if isinstance(value, datetime.datetime):
+        value = value.isoformat()
+
+    return base64.urlsafe_b64encode(json.dumps([value, id]))
+
+
+def decode_cursor(cursor, column):
+    """
+    Decode a cursor made by :py:func:`encode_cursor`, None if it is
+    missing or invalid
+
+    :param cursor: The cursor from the query string
+    :type cursor: str
+
+    :param column: The sort column, used to convert the value back
+    :type column: sqlalchemy.orm.attributes.InstrumentedAttribute
+
+    :returns: tuple or None -- Sort value, primary key
+    """
+
+    if not cursor:
+        return None
+
+    try:
+        value, id = json.loads(base64.urlsafe_b64decode(str(cursor)))
+    except (TypeError, ValueError):
+        return None
+
+    if column.type.python_type is datetime.datetime:
+        for fmt in DATETIME_FORMATS:
+            try:
+                value = datetime.datetime.strptime(value, fmt)
+                break
+            except (TypeError, ValueError):
+                continue
+        else:
+            return None
+
+    return value, id
+
+
+class KeysetTableView(AdminModelTableView):
+    """
+    Admin model table paginated by seeking from the last row shown, each
+    page is an indexed range scan however deep it is, unlike OFFSET which
+    reads and discards every earlier row. Rows are ordered by one of the
+    ``sortable`` columns, the first being the default, then by ``id`` so the
+    order is stable when sort values repeat. Back each with an index on
+    ``(column, id)``, sort columns must not contain NULLs.
+
+    The total number of rows is only counted when ``count`` is set or the
+    ``count`` query argument is given. Rows are read from a replica when
+    any are configured.
+
+        class index(KeysetTableView):
+            model = Job
+            columns = ['title', 'created', 'updated']
+            sortable = ['created', 'title']
+    """
+
+    template = 'admin/keyset_table.html'
+    decorators = [read_replicas.routed]
+    num_per_page = 30
+    sortable = ['created']
+    count = False
+
+    def set_context(self):
+        super(KeysetTableView, self).set_context()
+
+        self.add_context('sortable', self.sortable)
+        self.add_context('page_url', self.page_url)
+
+    def get_sort(self):
+        """
+        Returns the sort column name and direction from the query string
+
+        :returns: tuple -- Column name, ``asc`` or ``desc``
+        """
+
+        sort = request.args.get('sort')
+        if sort not in self.sortable:
+            sort = self.sortable[0]
+
+        direction = 'asc' if request.args.get('dir') == 'asc' else 'desc'
+
+        return sort, direction
+
+    def page_url(self, **kwargs):
+        """
+        Build the URL of another page of this table, keeping the current
+        sort unless overridden
+
+        :returns: str
+        """
+
+        sort, direction = self.get_sort()
+        args = {'sort': sort, 'dir': direction}
+        if request.args.get('count'):
+            args['count'] = 1
+        args.update(kwargs)
+
+        return url_for(request.endpoint, **args)
+
+    def get_objects(self):
+        """
+        Returns the rows of the requested page and a :py:class:`KeysetPage`
+        in place of velox's OFFSET pagination object
+
+        :returns: tuple -- List of model instances, KeysetPage
+        """
+
+        model = self.get_model()
+        query = self.get_basequery()
+        per_page = self.get_per_page()
+
+        sort, direction = self.get_sort()
+        column = getattr(model, sort)
+
+        after = decode_cursor(request.args.get('after'), column)
+        before = decode_cursor(request.args.get('before'), column)
+
+        # Pages before the cursor are read in reverse then flipped back
+        forward = before is None
+        cursor = after if forward else before
+        descending = (direction == 'desc') == forward
+
+        total = None
+        if self.count or request.args.get('count'):
+            total = query.order_by(None).count()
+
+        if cursor is not None:
+            # Spelled out rather than a row value comparison, which SQLite
+            # only supports from 3.15
+            value, id = cursor
+            if descending:
+                seek = or_(
+                    column < value,
+                    and_(column == value, model.id < id))
+            else:
+                seek = or_(
+                    column > value,
+                    and_(column == value, model.id > id))
+            query = query.filter(seek)
+
+        order = desc if descending else asc
+        rows = query.order_by(order(column), order(model.id)) \
+            .limit(per_page + 1).all()
+
+        more = len(rows) > per_page
+        rows = rows[:per_page]
+        if not forward:
+            rows.reverse()
+
+        if forward:
+            has_next, has_prev = more, cursor is not None
+        else:
+            has_next, has_prev = cursor is not None, more
+
+        next = prev = None
+        if rows and has_next:
+            next = encode_cursor(getattr(rows[-1], sort), rows[-1].id)
+        if rows and has_prev:
+            prev = encode_cursor(getattr(rows[0], sort), rows[0].id)
+
+        return rows, KeysetPage(rows, sort, direction, next, prev, total)
@@ -7,18 +7,45 @@
 
 from flask.ext.velox.views.sqla.read import ModelListView
 from flask.ext.velox.views.template import TemplateView
+from soon.conditional import conditional, make_etag, template_validators
+from soon.ext import read_replicas, response_cache
 from soon.jobs.models import Job
 
 
+def home_validators():
+    """
+    ETag and Last-Modified for the home page, derived from the most recently
+    updated job so unchanged pages cost a single query.
+
+    :returns: tuple -- etag, last_modified
+    """
+
+    updated, count = Job.freshness()
+
+    return make_etag(updated, count), updated
+
+
 class HomeView(ModelListView):
     model = Job
     template = 'home.html'
     paginate = False
+    decorators = [
+        conditional(home_validators),
+        response_cache.cached,
+        read_replicas.routed]
 
 # Peabody Portfolio View
 class peabody(TemplateView):
     template = 'peabody.html'
+    decorators = [
+        conditional(template_validators(template, 'layout/base.html')),
+        response_cache.cached,
+        read_replicas.routed]
 
 # Peabody Portfolio View
 class residentadvisor(TemplateView):
     template = 'residentadvisor.html'
+    decorators = [
+        conditional(template_validators(template, 'layout/base.html')),
+        response_cache.cached,
+        read_replicas.routed]
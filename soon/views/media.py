@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: soon.views.media
+   :synopsis: Media (uploaded files) views
+"""
+
+import mimetypes
+import os
+import posixpath
+
+from flask import abort, current_app
+from flask.helpers import safe_join
+from soon.ranges import send_file_ranged
+from werkzeug.urls import url_quote
+
+
+# Authorisation callbacks keyed by the top level media directory
+_authorisers = {}
+
+# Callbacks mapping requested names to stored files, keyed by directory
+_resolvers = {}
+
+
+def media_authoriser(directory):
+    """
+    Register a function which decides if a file under a media directory
+    may be served, it is passed the path relative to ``MEDIA_ROOT`` and
+    should return a boolean:
+
+        @media_authoriser('jobs')
+        def job_spec(filename):
+            return Job.query.filter_by(spec=filename).count() > 0
+
+    :param directory: Top level directory within ``MEDIA_ROOT``
+    :type directory: str
+
+    :returns: function -- Decorator
+    """
+
+    def decorator(func):
+        _authorisers[directory] = func
+        return func
+
+    return decorator
+
+
+def media_resolver(directory):
+    """
+    Register a function which maps a requested name under a media directory
+    to the path of the file holding its content, relative to
+    ``MEDIA_ROOT``, for storages where the two differ:
+
+        media_resolver('jobs')(spec_store.blob)
+
+    :param directory: Top level directory within ``MEDIA_ROOT``
+    :type directory: str
+
+    :returns: function -- Decorator
+    """
+
+    def decorator(func):
+        _resolvers[directory] = func
+        return func
+
+    return decorator
+
+
+def resolve(filename):
+    """
+    Resolve a media file to an absolute path, aborting with 404 if it
+    does not exist or is not authorised to be served.
+
+    :param filename: Path of the file relative to ``MEDIA_ROOT``
+    :type filename: str
+
+    :returns: str -- Absolute path
+    """
+
+    directory = filename.split('/', 1)[0]
+
+    resolver = _resolvers.get(directory)
+    stored = resolver(filename) if resolver is not None else filename
+
+    path = safe_join(current_app.config['MEDIA_ROOT'], stored)
+    if not os.path.isfile(path):
+        abort(404)
+
+    authorise = _authorisers.get(directory)
+    if authorise is not None and not authorise(filename):
+        abort(404)
+
+    return path
+
+
+def media(filename):
+    """
+    Serve an uploaded file from ``MEDIA_ROOT``. The file is resolved and
+    authorised here, the bytes are transferred according to ``MEDIA_SERVE``:
+
+        - ``x-accel-redirect``: handed to nginx via an internal location
+          at ``MEDIA_ACCEL_PREFIX``
+        - ``x-sendfile``: handed to Apache / lighttpd via ``X-Sendfile``
+        - ``app``: sent by the application, whole files go through the WSGI
+          server's file wrapper (``sendfile(2)`` under uWSGI) while Range
+          requests are streamed in chunks, see
+          :py:func:`soon.ranges.send_file_ranged`.
+
+    :param filename: Path of the file relative to ``MEDIA_ROOT``
+    :type filename: str
+
+    :returns: flask.wrappers.Response
+    """
+
+    path = resolve(filename)
+    mode = current_app.config['MEDIA_SERVE']
+
+    if mode == 'x-accel-redirect':
+        response = current_app.response_class(
+            mimetype=mimetypes.guess_type(filename)[0])
+        stored = os.path.relpath(path, current_app.config['MEDIA_ROOT'])
+        response.headers['X-Accel-Redirect'] = url_quote(posixpath.join(
+            current_app.config['MEDIA_ACCEL_PREFIX'],
+            stored.replace(os.sep, '/')))
+        return response
+
+    if mode == 'x-sendfile':
+        response = current_app.response_class(
+            mimetype=mimetypes.guess_type(filename)[0])
+        response.headers['X-Sendfile'] = path
+        return response
+
+    return send_file_ranged(path)
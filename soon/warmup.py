@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: soon.warmup
+   :synopsis: Does the work each worker would otherwise repeat on its first
+              requests once, in the master process before it forks
+"""
+
+import gc
+
+from jinja2 import TemplateError
+from soon.ext import db
+from sqlalchemy.orm import configure_mappers
+
+
+#: Extensions of the files in template folders which are templates
+TEMPLATE_EXTENSIONS = ('html', 'txt', 'xml')
+
+#: Templates of the admin, which use filters only the full profile registers
+ADMIN_TEMPLATES = ('admin/', 'layout/admin.html')
+
+
+def compile_templates(app):
+    """
+    Load every template of the application, its blueprints and extensions
+    into the Jinja environment's cache, which is grown to hold them all so
+    none are evicted and compiled again. Templates not yet in the bytecode
+    cache, if one is configured, are written to it.
+
+    Admin templates are skipped in the public profile, which has no admin.
+    A template which fails to compile is logged and skipped, it fails again
+    when rendered rather than stopping the application loading.
+
+    :param app: Flask application instance
+    :type app: flask.app.Flask
+
+    :returns: int -- Number of templates compiled
+    """
+
+    env = app.jinja_env
+    names = env.list_templates(extensions=TEMPLATE_EXTENSIONS)
+
+    if app.config['APP_PROFILE'] != 'full':
+        names = [name for name in names
+                 if not name.startswith(ADMIN_TEMPLATES)]
+
+    # A negative cache_size gives an unbounded dict rather than an LRUCache
+    if hasattr(env.cache, 'capacity') and env.cache.capacity < len(names):
+        env.cache.capacity = len(names)
+
+    compiled = 0
+    for name in names:
+        try:
+            env.get_template(name)
+        except TemplateError:
+            app.logger.exception('Template %s failed to compile', name)
+        else:
+            compiled += 1
+
+    return compiled
+
+
+def warmup(app):
+    """
+    Prepare the application in the master process so forked workers share
+    the result copy on write, rather than each building it on its first
+    requests: mappers are configured, templates compiled and the URL map
+    built. Database connections opened meanwhile are then closed, workers
+    must not share them.
+
+    :param app: Flask application instance
+    :type app: flask.app.Flask
+    """
+
+    configure_mappers()
+    compile_templates(app)
+    app.url_map.update()
+
+    db.dispose(app)
+
+    # Objects collected now are not copied when a worker's collector first
+    # touches them
+    gc.collect()
@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: tests
+   :synopsis: Application test suite, run with ``py.test tests``
+"""
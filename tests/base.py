@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: tests.base
+   :synopsis: Test case running each test against a new application and
+              SQLite database
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from soon.ext import db, response_cache
+from soon.loader import create_app
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.compiler import compiles
+
+
+@compiles(postgresql.INET, 'sqlite')
+def _compile_inet_sqlite(element, compiler, **kw):
+    # Long enough for an IPv6 address
+    return 'VARCHAR(45)'
+
+
+class AppTestCase(unittest.TestCase):
+    """
+    Creates the application with its tables in a temporary SQLite database
+    and pushes a request context for each test. Settings in ``config`` are
+    applied before the database is first used.
+    """
+
+    #: Settings overriding the defaults
+    config = {}
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+        self.app = create_app()
+        self.app.config.update(
+            TESTING=True,
+            SQLALCHEMY_DATABASE_URI='sqlite:///{0}'.format(
+                os.path.join(self.directory, 'test.db')),
+            MEDIA_ROOT=os.path.join(self.directory, 'media'),
+            RESPONSE_CACHE_STAMP=os.path.join(self.directory, 'stamp'))
+        self.app.config.update(self.config)
+
+        self.client = self.app.test_client()
+
+        self.context = self.app.test_request_context()
+        self.context.push()
+
+        db.create_all()
+
+        # Rendered responses are kept per process, not per application
+        response_cache.invalidate()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        db.dispose(self.app)
+
+        self.context.pop()
+
+        shutil.rmtree(self.directory)
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: tests.test_auth
+   :synopsis: Admin login tests
+"""
+
+from flask.ext.security.utils import encrypt_password
+from soon.auth.forms import AuthenticationForm
+from soon.auth.models import User
+from soon.ext import db
+from tests.base import AppTestCase
+
+
+class AdminLoginTestCase(AppTestCase):
+
+    config = {
+        'WTF_CSRF_ENABLED': False,
+        'LOGIN_THROTTLE_LIMITS': {'ip': (3, 60), 'email': (3, 60)}}
+
+    def setUp(self):
+        super(AdminLoginTestCase, self).setUp()
+
+        db.session.add(User(
+            email=u'dork@thisissoon.com',
+            password=encrypt_password('secret'),
+            active=True))
+        db.session.commit()
+
+    def login(self, password):
+        """
+        Validate the admin login form as posted, returns its errors
+        """
+
+        data = {'email': u'dork@thisissoon.com', 'password': password}
+        with self.app.test_request_context(
+                '/admin/', method='POST', data=data):
+            form = AuthenticationForm()
+            form.validate()
+            return form.errors.get('password', [])
+
+    def test_no_flask_security_login(self):
+        response = self.client.post('/login', data={
+            'email': u'dork@thisissoon.com',
+            'password': 'secret'})
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_throttled(self):
+        for _ in range(3):
+            self.assertIn(
+                'Inccorect Email or Password combination',
+                self.login('wrong'))
+
+        self.assertEqual(
+            self.login('secret'),
+            ['Too many login attempts, please try again'])
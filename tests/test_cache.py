@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: tests.test_cache
+   :synopsis: Response cache tests
+"""
+
+import io
+import os
+
+from soon.auth.models import User
+from soon.ext import db, response_cache
+from soon.jobs.models import Job
+from soon.jobs.storage import spec_store
+from tests.base import AppTestCase
+
+
+class ResponseCacheTestCase(AppTestCase):
+
+    config = {'FILE_CLEANUP_WORKER': False}
+
+    def setUp(self):
+        super(ResponseCacheTestCase, self).setUp()
+
+        self.user = User(email=u'dork@thisissoon.com', password='x')
+        db.session.add(self.user)
+        db.session.commit()
+
+    def add_job(self, title):
+        job = Job(
+            title=title,
+            blurb=u'Blurb',
+            spec=spec_store.save(io.BytesIO(b'spec'), 'spec.pdf'),
+            user_id=self.user.id)
+        db.session.add(job)
+        return job
+
+    def test_cached(self):
+        self.client.get('/')
+
+        self.assertIn(('home', '/'), response_cache._entries)
+
+    def test_invalidated_on_commit(self):
+        job = self.add_job(u'Developer')
+        db.session.commit()
+
+        self.assertIn(u'Developer', self.client.get('/').get_data(as_text=True))
+
+        job.title = u'Designer'
+        db.session.commit()
+
+        self.assertIn(u'Designer', self.client.get('/').get_data(as_text=True))
+
+    def test_invalidated_by_other_process(self):
+        self.client.get('/')
+
+        # Touched by another process
+        os.utime(self.app.config['RESPONSE_CACHE_STAMP'], (0, 0))
+        response_cache.get(('home', '/'))
+
+        self.assertNotIn(('home', '/'), response_cache._entries)
+
+    def test_query_string_ignored(self):
+        self.client.get('/?a=1')
+        self.client.get('/?a=2')
+
+        self.assertEqual(list(response_cache._entries), [('home', '/')])
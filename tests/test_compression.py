@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: tests.test_compression
+   :synopsis: Compressed response tests
+"""
+
+from tests.base import AppTestCase
+
+
+class CompressResponseTestCase(AppTestCase):
+
+    config = {'COMPRESS_DYNAMIC': True}
+
+    def get(self, url, **headers):
+        return self.client.get(url, headers=headers)
+
+    def test_gzip_etag(self):
+        identity = self.get('/')
+        gzipped = self.get('/', **{'Accept-Encoding': 'gzip'})
+
+        self.assertEqual(gzipped.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(
+            gzipped.headers['ETag'],
+            identity.headers['ETag'][:-1] + '-gzip"')
+        self.assertIn('Accept-Encoding', gzipped.headers['Vary'])
+
+    def test_gzip_not_modified(self):
+        etag = self.get('/', **{'Accept-Encoding': 'gzip'}).headers['ETag']
+
+        response = self.get('/', **{
+            'Accept-Encoding': 'gzip',
+            'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_static_identity_varies(self):
+        response = self.get('/static/css/soon.css')
+
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
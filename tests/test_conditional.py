@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: tests.test_conditional
+   :synopsis: Conditional GET tests for the portfolio pages
+"""
+
+from tests.base import AppTestCase
+
+
+class PortfolioConditionalTestCase(AppTestCase):
+
+    def test_validators(self):
+        for url in ('/peabody/', '/residentadvisor/'):
+            response = self.client.get(url)
+
+            self.assertEqual(response.status_code, 200)
+            self.assertIsNotNone(response.headers.get('ETag'))
+            self.assertIsNotNone(response.headers.get('Last-Modified'))
+
+    def test_if_none_match(self):
+        etag = self.client.get('/peabody/').headers['ETag']
+
+        response = self.client.get(
+            '/peabody/',
+            headers={'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_if_modified_since(self):
+        modified = self.client.get('/residentadvisor/').headers[
+            'Last-Modified']
+
+        response = self.client.get(
+            '/residentadvisor/',
+            headers={'If-Modified-Since': modified})
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_pages_differ(self):
+        self.assertNotEqual(
+            self.client.get('/peabody/').headers['ETag'],
+            self.client.get('/residentadvisor/').headers['ETag'])
+
+
+class UncachedPortfolioConditionalTestCase(AppTestCase):
+
+    config = {'RESPONSE_CACHE_ENABLED': False}
+
+    def test_if_none_match(self):
+        etag = self.client.get('/peabody/').headers['ETag']
+
+        response = self.client.get(
+            '/peabody/',
+            headers={'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 304)
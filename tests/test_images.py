@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: tests.test_images
+   :synopsis: Responsive image template helper tests
+"""
+
+from soon.ext import responsive_images
+from tests.base import AppTestCase
+
+
+class ResponsiveBackgroundTestCase(AppTestCase):
+
+    def setUp(self):
+        super(ResponsiveBackgroundTestCase, self).setUp()
+
+        responsive_images.variants = {
+            'img/folio/ra6.png': [480, 768, 1200, 1600],
+            'img/folio/ra6-m.png': [480, 600]}
+
+    def tearDown(self):
+        responsive_images.variants = {}
+
+        super(ResponsiveBackgroundTestCase, self).tearDown()
+
+    def test_cover_uses_variants_above_mobile(self):
+        css = responsive_images.background(
+            '#ra6',
+            'img/folio/ra6.png',
+            cover=True)
+
+        self.assertNotIn('480w', css)
+        self.assertIn(
+            '@media (min-width: 768px) { #ra6 { background-image: '
+            'url("/static/img/responsive/folio/ra6-768w.png"); } }', css)
+        self.assertIn(
+            '@media (min-width: 769px) { #ra6 { background-image: '
+            'url("/static/img/responsive/folio/ra6-1200w.png"); } }', css)
+        self.assertIn(
+            '@media (min-width: 1201px) { #ra6 { background-image: '
+            'url("/static/img/folio/ra6.png"); } }', css)
+
+    def test_natural_size_uses_full_image(self):
+        self.assertEqual(
+            responsive_images.background('#ra6', 'img/folio/ra6.png'),
+            '<style>@media (min-width: 768px) { #ra6 { background-image: '
+            'url("/static/img/folio/ra6.png"); } }</style>')
+
+    def test_mobile_image_blank_on_larger_screens(self):
+        html = responsive_images.mobile_image('img/folio/ra6-m.png')
+
+        self.assertTrue(html.startswith(
+            '<picture><source srcset="data:image/gif;base64,'))
+        self.assertIn('media="(min-width: 768px)"', html)
+        self.assertIn('ra6-m-480w.webp 480w', html)
+        self.assertIn('<img src="/static/img/folio/ra6-m.png"', html)
+
+    def test_page_has_no_unconditional_background(self):
+        html = self.client.get('/residentadvisor/').data
+
+        self.assertNotIn("url('/static/img/folio/ra6.png')", html)
+        self.assertNotIn('class="hidden-sm hidden-md hidden-lg img-', html)
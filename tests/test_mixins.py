@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: tests.test_mixins
+   :synopsis: Model mixin tests
+"""
+
+from soon.db.mixins import GetOrCreateMixin
+from soon.ext import db
+from sqlalchemy.exc import IntegrityError
+from tests.base import AppTestCase
+
+
+class Tag(db.Model, GetOrCreateMixin):
+
+    __tablename__ = 'test_tag'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.Unicode(80), unique=True, nullable=False)
+    colour = db.Column(db.Unicode(20))
+
+
+class GetOrCreateTestCase(AppTestCase):
+
+    def test_creates_then_gets(self):
+        existed, tag = Tag.get_or_create(name=u'python')
+        self.assertFalse(existed)
+        self.assertIsNotNone(tag.id)
+
+        existed, again = Tag.get_or_create(name=u'python')
+        self.assertTrue(existed)
+        self.assertEqual(again.id, tag.id)
+        self.assertEqual(Tag.query.count(), 1)
+
+    def test_without_commit(self):
+        existed, tag = Tag.get_or_create(commit=False, name=u'python')
+        self.assertFalse(existed)
+        db.session.rollback()
+        self.assertEqual(Tag.query.count(), 0)
+
+    def test_many(self):
+        Tag.get_or_create(name=u'b')
+
+        results = Tag.get_or_create_many([
+            {'name': u'a'},
+            {'name': u'b'},
+            {'name': u'a'},
+            {'name': u'c'}])
+        db.session.commit()
+
+        self.assertEqual(
+            [(existed, tag.name) for existed, tag in results],
+            [(False, u'a'), (True, u'b'), (True, u'a'), (False, u'c')])
+        self.assertIs(results[0][1], results[2][1])
+        self.assertEqual(Tag.query.count(), 3)
+
+    def test_many_empty(self):
+        self.assertEqual(Tag.get_or_create_many([]), [])
+
+    def test_created_concurrently(self):
+        # Another connection inserts the row between the select and insert
+        db.engine.execute(Tag.__table__.insert().values(name=u'late'))
+        created = Tag._insert_each([{'name': u'late'}])
+
+        self.assertEqual(created, {(u'late', ): None})
+        self.assertEqual(Tag.query.filter_by(name=u'late').count(), 1)
+
+    def test_other_integrity_error_raised(self):
+        with self.assertRaises(IntegrityError):
+            Tag._insert_each([{'name': None}])
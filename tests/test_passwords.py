@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: tests.test_passwords
+   :synopsis: Password hashing pool tests
+"""
+
+import time
+
+from flask.ext.security.utils import encrypt_password
+from soon.auth.models import User
+from soon.ext import db, hash_pool
+from tests.base import AppTestCase
+
+
+class HashPoolTestCase(AppTestCase):
+
+    def add_user(self, password):
+        user = User(email=u'dork@thisissoon.com', password=password)
+        db.session.add(user)
+        db.session.commit()
+        return user
+
+    def test_verify(self):
+        user = self.add_user(encrypt_password('secret'))
+
+        self.assertTrue(hash_pool.verify('secret', user))
+        self.assertFalse(hash_pool.verify('wrong', user))
+
+    def test_outdated_hash_upgraded(self):
+        # Plain text is a deprecated scheme of Flask-Security's context
+        user = self.add_user('secret')
+        user_id = user.id
+
+        self.assertTrue(hash_pool.verify('secret', user))
+
+        # Upgraded by a further task which the login does not wait for
+        for _ in range(100):
+            db.session.remove()
+            password = User.query.get(user_id).password
+            if password != 'secret':
+                break
+            time.sleep(0.05)
+
+        self.assertTrue(password.startswith('$6$'))
+        self.assertTrue(hash_pool.verify('secret', User.query.get(user_id)))
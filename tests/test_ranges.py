@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: tests.test_ranges
+   :synopsis: Range request tests for media served by the application
+"""
+
+import os
+
+from soon.ranges import satisfiable_ranges
+from tests.base import AppTestCase
+
+
+class SatisfiableRangesTestCase(AppTestCase):
+
+    config = {'MEDIA_MAX_RANGES': 2}
+
+    def test_ranges(self):
+        cases = [
+            ('bytes=0-9', [(0, 10)]),
+            ('bytes=90-', [(90, 100)]),
+            ('bytes=-10', [(90, 100)]),
+            ('bytes=95-200', [(95, 100)]),
+            ('bytes=-200', [(0, 100)]),
+            ('bytes=0-0,-1', [(0, 1), (99, 100)])]
+
+        for header, expected in cases:
+            self.assertEqual(satisfiable_ranges(header, 100), expected)
+
+    def test_unsatisfiable(self):
+        self.assertEqual(satisfiable_ranges('bytes=100-', 100), [])
+        self.assertEqual(satisfiable_ranges('bytes=200-300', 100), [])
+        self.assertEqual(satisfiable_ranges('bytes=-1', 0), [])
+
+    def test_ignored(self):
+        for header in [
+                None,
+                'bytes=9-0',
+                'bytes=a-b',
+                'items=0-9',
+                'bytes=0-1,2-3,4-5']:
+            self.assertIsNone(satisfiable_ranges(header, 100))
+
+
+class RangeRequestTestCase(AppTestCase):
+
+    def setUp(self):
+        super(RangeRequestTestCase, self).setUp()
+
+        os.makedirs(os.path.join(self.app.config['MEDIA_ROOT'], 'files'))
+        with open(os.path.join(
+                self.app.config['MEDIA_ROOT'],
+                'files',
+                'a.txt'), 'wb') as f:
+            f.write(b'0123456789' * 10)
+
+    def get(self, url='/media/files/a.txt', **headers):
+        return self.client.get(url, headers=headers)
+
+    def test_whole(self):
+        response = self.get()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Accept-Ranges'], 'bytes')
+        self.assertEqual(len(response.data), 100)
+
+    def test_single_range(self):
+        response = self.get(Range='bytes=10-14')
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.headers['Content-Range'], 'bytes 10-14/100')
+        self.assertEqual(response.headers['Content-Length'], '5')
+        self.assertEqual(response.data, b'01234')
+
+    def test_multiple_ranges(self):
+        response = self.get(Range='bytes=0-1,-2')
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.mimetype, 'multipart/byteranges')
+        self.assertEqual(
+            int(response.headers['Content-Length']),
+            len(response.data))
+        self.assertIn(
+            b'Content-Range: bytes 0-1/100\r\n\r\n01\r\n--', response.data)
+        self.assertIn(
+            b'Content-Range: bytes 98-99/100\r\n\r\n89\r\n--', response.data)
+
+    def test_unsatisfiable(self):
+        for header in ['bytes=100-', 'bytes=500-600']:
+            response = self.get(Range=header)
+
+            self.assertEqual(response.status_code, 416)
+            self.assertEqual(response.headers['Content-Range'], 'bytes */100')
+            self.assertEqual(response.data, b'')
+
+    def test_malformed_range_sends_whole_file(self):
+        response = self.get(Range='bytes=5-1')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 100)
+
+    def test_stale_if_range_sends_whole_file(self):
+        response = self.get(Range='bytes=0-9', **{'If-Range': '"stale"'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 100)
+
+    def test_if_range_matching(self):
+        etag = self.get().headers['ETag']
+
+        response = self.get(Range='bytes=0-9', **{'If-Range': etag})
+
+        self.assertEqual(response.status_code, 206)
+
+    def test_not_modified(self):
+        etag = self.get().headers['ETag']
+
+        response = self.get(**{'If-None-Match': etag})
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_path_traversal(self):
+        for url in [
+                '/media/../setup.py',
+                '/media/files/../../test.db',
+                '/media/files/%2e%2e/%2e%2e/test.db']:
+            self.assertEqual(self.get(url).status_code, 404)
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: tests.test_startup
+   :synopsis: Start up profile tests
+"""
+
+import io
+import time
+import unittest
+
+from soon.startup import StartupProfile
+
+
+class StartupProfileTestCase(unittest.TestCase):
+
+    def setUp(self):
+        # Enabled without timing imports
+        self.profile = StartupProfile()
+        self.profile.enabled = True
+
+    def test_nested_entries_record_self_time(self):
+        with self.profile.timed('outer'):
+            time.sleep(0.01)
+            with self.profile.timed('inner'):
+                time.sleep(0.05)
+
+        timings = self.profile.timings
+        self.assertGreaterEqual(timings['inner'], 0.05)
+        self.assertGreaterEqual(timings['outer'], 0.01)
+        self.assertLess(timings['outer'], 0.05)
+
+    def test_report(self):
+        with self.profile.timed('init Flask-Admin'):
+            pass
+
+        out = io.BytesIO()
+        self.profile.report(out)
+
+        self.assertIn('init Flask-Admin', out.getvalue())
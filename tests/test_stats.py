@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: tests.test_stats
+   :synopsis: Per request query statistics tests
+"""
+
+import logging
+
+from tests.base import AppTestCase
+
+
+class RecordHandler(logging.Handler):
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class QueryStatsTestCase(AppTestCase):
+
+    def setUp(self):
+        super(QueryStatsTestCase, self).setUp()
+
+        self.handler = RecordHandler()
+        self.level = self.app.logger.level
+        self.app.logger.addHandler(self.handler)
+        self.app.logger.setLevel(logging.DEBUG)
+
+    def tearDown(self):
+        self.app.logger.removeHandler(self.handler)
+        self.app.logger.setLevel(self.level)
+
+        super(QueryStatsTestCase, self).tearDown()
+
+    def summaries(self):
+        return [
+            record.levelno for record in self.handler.records
+            if record.getMessage().startswith('Request queries')]
+
+    def test_summary_debug(self):
+        self.app.config['QUERY_SLOW_THRESHOLD'] = 60
+        self.client.get('/')
+
+        self.assertEqual(self.summaries(), [logging.DEBUG])
+
+    def test_summary_slow(self):
+        self.app.config['QUERY_SLOW_THRESHOLD'] = 0
+        self.client.get('/')
+
+        self.assertEqual(self.summaries(), [logging.WARNING])
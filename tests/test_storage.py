@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: tests.test_storage
+   :synopsis: Content addressed job spec storage tests
+"""
+
+import io
+import os
+
+from soon.auth.models import User
+from soon.ext import db, file_cleanup
+from soon.jobs.models import Job
+from soon.jobs.storage import spec_store
+from tests.base import AppTestCase
+
+
+class SpecStoreTestCase(AppTestCase):
+
+    # Released files are left for sweep, which ignores the grace period
+    config = {'FILE_CLEANUP_WORKER': False, 'FILE_CLEANUP_GRACE': 0}
+
+    def setUp(self):
+        super(SpecStoreTestCase, self).setUp()
+
+        self.user = User(email=u'dork@thisissoon.com', password='x')
+        db.session.add(self.user)
+        db.session.commit()
+
+    def add_job(self, content, filename):
+        job = Job(
+            title=u'Developer',
+            blurb=u'Blurb',
+            spec=spec_store.save(io.BytesIO(content), filename),
+            user_id=self.user.id)
+        db.session.add(job)
+        db.session.commit()
+        return job
+
+    def blobs(self):
+        return sorted(os.listdir(spec_store.root))
+
+    def sweep(self):
+        # Files written this second are not yet older than the grace period
+        for filename in os.listdir(spec_store.root):
+            os.utime(os.path.join(spec_store.root, filename), (0, 0))
+        file_cleanup.sweep()
+
+    def test_identical_uploads_share_blob(self):
+        first = self.add_job(b'spec', 'a.pdf')
+        second = self.add_job(b'spec', 'b.pdf')
+
+        self.assertNotEqual(first.spec, second.spec)
+        self.assertEqual(spec_store.blob(first.spec), spec_store.blob(
+            second.spec))
+        self.assertEqual(len(self.blobs()), 1)
+
+    def test_served_by_stored_name(self):
+        job = self.add_job(b'spec', 'a.pdf')
+
+        response = self.client.get('/media/' + job.spec)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, b'spec')
+
+    def test_blob_kept_while_referenced(self):
+        first = self.add_job(b'spec', 'a.pdf')
+        self.add_job(b'spec', 'b.pdf')
+
+        db.session.delete(first)
+        db.session.commit()
+        self.sweep()
+
+        self.assertEqual(len(self.blobs()), 1)
+
+    def test_unreferenced_blob_deleted(self):
+        first = self.add_job(b'spec', 'a.pdf')
+        second = self.add_job(b'other', 'b.pdf')
+
+        db.session.delete(first)
+        db.session.commit()
+        self.sweep()
+
+        self.assertEqual(self.blobs(), [os.path.basename(
+            spec_store.blob(second.spec))])
+
+    def test_rolled_back_delete_keeps_blob(self):
+        job = self.add_job(b'spec', 'a.pdf')
+
+        db.session.delete(job)
+        db.session.flush()
+        db.session.rollback()
+        self.sweep()
+
+        self.assertEqual(len(self.blobs()), 1)
+        self.assertEqual(Job.query.count(), 1)
+
+    def test_replaced_spec_released(self):
+        job = self.add_job(b'spec', 'a.pdf')
+
+        job.spec = spec_store.save(io.BytesIO(b'other'), 'a.pdf')
+        db.session.commit()
+        self.sweep()
+
+        self.assertEqual(self.blobs(), [os.path.basename(
+            spec_store.blob(job.spec))])
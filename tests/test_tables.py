@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: tests.test_tables
+   :synopsis: Keyset paginated admin table tests
+"""
+
+import datetime
+
+from soon.auth.models import User
+from soon.ext import db
+from soon.views.admin.tables import KeysetTableView
+from tests.base import AppTestCase
+
+
+class UserTable(KeysetTableView):
+    model = User
+    columns = ['email', 'created']
+    sortable = ['created', 'email']
+    num_per_page = 2
+
+
+class KeysetTableViewTestCase(AppTestCase):
+
+    def setUp(self):
+        super(KeysetTableViewTestCase, self).setUp()
+
+        # Repeated sort values so pages are split on the id tie breaker
+        created = datetime.datetime(2014, 6, 1, 12, 30, 15, 250)
+        for i in range(5):
+            db.session.add(User(
+                email=u'user{0}@thisissoon.com'.format(i),
+                password='x',
+                created=created))
+        db.session.commit()
+
+    def page(self, **args):
+        with self.app.test_request_context('/', query_string=args):
+            return UserTable().get_objects()
+
+    def walk(self, **args):
+        ids = []
+        page = self.page(**args)[1]
+        ids.extend(row.id for row in page.items)
+        while page.next:
+            args['after'] = page.next
+            page = self.page(**args)[1]
+            ids.extend(row.id for row in page.items)
+        return ids
+
+    def test_forward(self):
+        self.assertEqual(self.walk(sort='created', dir='asc'), [1, 2, 3, 4, 5])
+        self.assertEqual(self.walk(sort='created'), [5, 4, 3, 2, 1])
+
+    def test_backward(self):
+        rows, page = self.page(sort='created', dir='asc')
+        rows, page = self.page(sort='created', dir='asc', after=page.next)
+        rows, page = self.page(sort='created', dir='asc', before=page.prev)
+
+        self.assertEqual([row.id for row in rows], [1, 2])
+        self.assertIsNone(page.prev)
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+"""
+.. module:: tests.test_throttle
+   :synopsis: Login throttle tests
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from soon.ext import login_throttle
+from soon.throttle import MemoryBackend, SQLiteBackend
+from tests.base import AppTestCase
+
+
+class MemoryBackendTestCase(unittest.TestCase):
+
+    def backend(self):
+        return MemoryBackend(max_keys=2)
+
+    def test_lockout_and_recovery(self):
+        backend = self.backend()
+
+        # A burst of 3 refilled at one token per 10 seconds
+        allowed = [backend.consume('a', 3, 0.1, 100) for _ in range(4)]
+        self.assertEqual(allowed, [True, True, True, False])
+
+        self.assertFalse(backend.consume('a', 3, 0.1, 105))
+        self.assertTrue(backend.consume('a', 3, 0.1, 115))
+        self.assertFalse(backend.consume('a', 3, 0.1, 115))
+
+        # Refilled to the burst, not beyond
+        allowed = [backend.consume('a', 3, 0.1, 1000) for _ in range(4)]
+        self.assertEqual(allowed, [True, True, True, False])
+
+    def test_keys_independent(self):
+        backend = self.backend()
+
+        self.assertTrue(backend.consume('a', 1, 0.1, 100))
+        self.assertFalse(backend.consume('a', 1, 0.1, 100))
+        self.assertTrue(backend.consume('b', 1, 0.1, 100))
+
+
+class MemoryBackendEvictionTestCase(unittest.TestCase):
+
+    def test_least_recently_used_evicted(self):
+        backend = MemoryBackend(max_keys=2)
+
+        for key in ['a', 'b', 'c']:
+            backend.consume(key, 1, 0.1, 100)
+
+        self.assertEqual(list(backend._buckets), ['b', 'c'])
+
+
+class SQLiteBackendTestCase(MemoryBackendTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def backend(self):
+        return SQLiteBackend(os.path.join(self.directory, 'throttle.db'))
+
+    def test_shared_between_backends(self):
+        first, second = self.backend(), self.backend()
+
+        self.assertTrue(first.consume('a', 1, 0.1, 100))
+        self.assertFalse(second.consume('a', 1, 0.1, 100))
+
+
+class LoginThrottleTestCase(AppTestCase):
+
+    config = {'LOGIN_THROTTLE_LIMITS': {'ip': (4, 60), 'email': (2, 60)}}
+
+    def test_limited_by_email(self):
+        self.assertTrue(login_throttle.allow('10.0.0.1', 'a@soon.com'))
+        self.assertTrue(login_throttle.allow('10.0.0.2', 'A@soon.com'))
+        self.assertFalse(login_throttle.allow('10.0.0.3', 'a@soon.com'))
+        self.assertTrue(login_throttle.allow('10.0.0.3', 'b@soon.com'))
+
+    def test_limited_by_ip(self):
+        for email in ['a@soon.com', 'b@soon.com', 'c@soon.com', 'd@soon.com']:
+            self.assertTrue(login_throttle.allow('10.0.0.1', email))
+
+        self.assertFalse(login_throttle.allow('10.0.0.1', 'e@soon.com'))
+        self.assertTrue(login_throttle.allow('10.0.0.2', 'e@soon.com'))
+
+    def test_disabled(self):
+        self.app.config['LOGIN_THROTTLE_ENABLED'] = False
+
+        for _ in range(5):
+            self.assertTrue(login_throttle.allow('10.0.0.1', 'a@soon.com'))